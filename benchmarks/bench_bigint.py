@@ -0,0 +1,41 @@
+"""
+Замер трансляции больших двоичных литералов.
+
+Запуск: python benchmarks/bench_bigint.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from translator import TomlTranslator, int_to_decimal
+
+
+def measure(func, *args):
+    """Время выполнения func в секундах."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    """Сравнение int_to_decimal со str() и полной трансляции."""
+    sys.set_int_max_str_digits(0)
+    translator = TomlTranslator()
+    hex_translator = TomlTranslator(int_format='hex')
+    
+    print(f"{'биты':>10} {'str()':>10} {'int_to_decimal':>15} {'translate':>10} {'hex':>10}")
+    for bits in (10_000, 100_000, 1_000_000):
+        value = random.getrandbits(bits) | (1 << (bits - 1))
+        text = f"flags: 0b{value:b};"
+        print(f"{bits:>10} "
+              f"{measure(str, value):>10.4f} "
+              f"{measure(int_to_decimal, value):>15.4f} "
+              f"{measure(translator.translate, text):>10.4f} "
+              f"{measure(hex_translator.translate, text):>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
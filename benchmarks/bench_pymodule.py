@@ -0,0 +1,77 @@
+"""
+Замер загрузки конфигурации: импорт модуля pymodule против разбора TOML.
+
+Запуск: python benchmarks/bench_pymodule.py [количество_таблиц]
+"""
+import importlib
+import os
+import py_compile
+import sys
+import tempfile
+import time
+import tomllib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from translator import TomlTranslator
+
+
+REPEAT = 20
+
+
+def make_config(count):
+    """Конфигурация из count таблиц со ссылками на общие константы."""
+    lines = ["base: 0b1010;", "common: table([ a = 0b1, b = .(base). ]);"]
+    for i in range(count):
+        name = 'k' + ''.join(chr(ord('a') + int(d)) for d in str(i))
+        lines.append(f"{name}: table([ port = 0b1000000, opts = .(common)., n = 0b{i:b} ]);")
+    return "\n".join(lines)
+
+
+def best_of(func):
+    """Лучшее время из REPEAT запусков func в секундах."""
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Сравнение импорта модуля (из .pyc) с tomllib.load."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    outputs, errors = TomlTranslator().translate_many(make_config(count), ['inline', 'pymodule'])
+    if errors:
+        raise SystemExit('\n'.join(errors))
+    
+    with tempfile.TemporaryDirectory() as directory:
+        toml_path = os.path.join(directory, 'config_data.toml')
+        with open(toml_path, 'w', encoding='utf-8') as f:
+            f.write(outputs['inline'])
+        module_path = os.path.join(directory, 'config_data.py')
+        with open(module_path, 'w', encoding='utf-8') as f:
+            f.write(outputs['pymodule'])
+        # Явная компиляция: .pyc нужен даже при PYTHONDONTWRITEBYTECODE
+        py_compile.compile(module_path, doraise=True)
+        
+        sys.path.insert(0, directory)
+        
+        def load_module():
+            sys.modules.pop('config_data', None)
+            importlib.import_module('config_data')
+        
+        def load_toml():
+            with open(toml_path, 'rb') as f:
+                tomllib.load(f)
+        
+        module_time = best_of(load_module)
+        toml_time = best_of(load_toml)
+    
+    print(f"Таблиц: {count}")
+    print(f"import (pyc): {module_time * 1000:8.2f} мс")
+    print(f"tomllib.load: {toml_time * 1000:8.2f} мс ({toml_time / module_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Замер памяти на токен: список LexToken против TokenBuffer.
+
+Запуск: python benchmarks/bench_tokens.py [количество_инструкций]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import ConfigLexer
+
+
+def make_config(count):
+    """Конфигурация из count объявлений по 17 токенов."""
+    lines = []
+    for i in range(count):
+        name = 'k' + ''.join(chr(ord('a') + int(d)) for d in str(i))
+        lines.append(f"{name}: table([ port = 0b1010, size = .(base). ]);")
+    return "base: 0b1;\n" + "\n".join(lines) + "\n"
+
+
+def measure(func, data):
+    """Память (байт), удерживаемая результатом func, и время в секундах."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(data)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    """Сравнение get_tokens и get_token_buffer."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    data = make_config(count)
+    lexer = ConfigLexer()
+    lexer.build()
+    
+    tokens, list_size, list_time = measure(lexer.get_tokens, data)
+    ntokens = len(tokens)
+    del tokens
+    buffer, buffer_size, buffer_time = measure(lexer.get_token_buffer, data)
+    
+    print(f"Токенов: {ntokens}")
+    print(f"get_tokens:       {list_size / ntokens:8.1f} байт/токен, {list_time:.3f} с")
+    print(f"get_token_buffer: {buffer_size / len(buffer):8.1f} байт/токен, {buffer_time:.3f} с")
+
+
+if __name__ == '__main__':
+    main()
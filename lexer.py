@@ -1,5 +1,9 @@
+import re
+
 import ply.lex as lex
 
+from tokenbuffer import TokenBuffer
+
 
 class ConfigLexer:
     """Лексер для учебного конфигурационного языка."""
@@ -9,6 +13,8 @@ class ConfigLexer:
         'BINARY_NUMBER',    # Двоичное число 0b... или 0B...
         'NAME',             # Имя [a-z]+
         'TABLE',            # Ключевое слово table
+        'INCLUDE',          # Ключевое слово include
+        'STRING',           # Строка в двойных кавычках (путь к файлу)
         'LPAREN',           # (
         'RPAREN',           # )
         'LBRACKET',         # [
@@ -21,6 +27,12 @@ class ConfigLexer:
         'COMMENT',          # Комментарий (для пропуска)
     )
     
+    # Ключевые слова
+    reserved = {
+        'table': 'TABLE',
+        'include': 'INCLUDE',
+    }
+    
     # Игнорируемые символы (пробелы и табуляция)
     t_ignore = ' \t'
     
@@ -50,15 +62,20 @@ class ConfigLexer:
         t.value = int(t.value, 2)
         return t
     
+    def t_STRING(self, t):
+        r'"[^"\n]*"'
+        # Убираем кавычки
+        t.value = t.value[1:-1]
+        return t
+    
     def t_TABLE(self, t):
         r'table'
         return t
     
     def t_NAME(self, t):
         r'[a-z]+'
-        # Проверяем, не является ли это ключевым словом table
-        if t.value == 'table':
-            t.type = 'TABLE'
+        # Проверяем, не является ли это ключевым словом
+        t.type = self.reserved.get(t.value, 'NAME')
         return t
     
     def t_newline(self, t):
@@ -79,12 +96,19 @@ class ConfigLexer:
     def input(self, data):
         """Передача входных данных лексеру."""
         self.errors = []
+        self.lexer.lineno = 1
         self.lexer.input(data)
     
     def token(self):
         """Получение следующего токена."""
         return self.lexer.token()
     
+    @staticmethod
+    def find_column(data, lexpos):
+        """Номер столбца (с 1) для позиции lexpos во входных данных."""
+        line_start = data.rfind('\n', 0, lexpos) + 1
+        return lexpos - line_start + 1
+    
     def get_tokens(self, data):
         """Получение списка всех токенов."""
         self.input(data)
@@ -95,6 +119,174 @@ class ConfigLexer:
                 break
             tokens.append(tok)
         return tokens
+    
+    def stream(self, chunks, limits=None):
+        """
+        Лексический анализ текста, поступающего частями.
+        
+        Args:
+            chunks: Итератор строк произвольной длины
+            limits: ExpansionLimits для проверки размера входа по мере чтения
+            
+        Returns:
+            StreamLexer - источник токенов для парсера
+        """
+        return StreamLexer(self, chunks, limits)
+    
+    def get_token_buffer(self, data):
+        """
+        Получение всех токенов в виде компактного TokenBuffer.
+        
+        Объекты LexToken создаются лексером по одному и сразу
+        освобождаются: в буфере остаются только коды типов, смещения
+        и номера строк.
+        """
+        self.input(data)
+        buffer = TokenBuffer(data, self.tokens)
+        codes = {name: code for code, name in enumerate(self.tokens)}
+        lexer = self.lexer
+        while True:
+            tok = lexer.token()
+            if tok is None:
+                break
+            buffer.append(codes[tok.type], tok.lexpos, lexer.lexpos, tok.lineno)
+        buffer.errors = list(self.errors)
+        return buffer
+
+
+class StreamLexer:
+    """
+    Источник токенов для ply.yacc по тексту, поступающему частями.
+    
+    Ни один токен не переходит через перевод строки и через символы-
+    разделители (пробелы и знаки пунктуации) вне строк и комментариев,
+    поэтому текст передается лексеру PLY кусками, которые заканчиваются
+    на такой границе. Остаток части до следующей границы откладывается
+    и склеивается один раз, когда граница появится. Позиции токенов
+    (lexpos) отсчитываются от начала всего текста, столбец сохраняется
+    в атрибуте column.
+    """
+    
+    # Символы, после которых всегда начинается новый токен
+    DELIMITERS = ' \t()[]=,:;.'
+    
+    # Начало комментария или строки
+    SPECIAL = re.compile(r'[/"]')
+    
+    # Состояния разбора неполной строки
+    CODE, SLASH, STRING, COMMENT = range(4)
+    
+    def __init__(self, config_lexer, chunks, limits=None):
+        """Инициализация чтения с первой части."""
+        self.config_lexer = config_lexer
+        self.chunks = iter(chunks)
+        self.limits = limits
+        self.lexer = config_lexer.lexer
+        self.lexdata = ''     # Текущий кусок
+        self.offset = 0       # Позиция начала куска во всем тексте
+        self.line_start = 0   # Позиция начала строки, на которой начался кусок
+        self.size = 0         # Прочитано байт (UTF-8)
+        self.chars = 0        # Прочитано символов
+        self.lineno = 1
+        self.lexpos = 0
+        self.pending = []     # Части текста после последней безопасной границы
+        self.state = self.CODE
+        self.finished = False
+        config_lexer.input('')
+    
+    @property
+    def errors(self):
+        """Ошибки лексического анализа."""
+        return self.config_lexer.errors
+    
+    def _scan(self, chunk, pos):
+        """
+        Поиск последней безопасной границы в chunk начиная с pos.
+        
+        Обновляет состояние self.state (код, строка, комментарий), которое
+        переходит из одной части в другую.
+        
+        Returns:
+            Позиция в chunk, до которой текст можно передать лексеру, или -1
+        """
+        safe = -1
+        while pos < len(chunk):
+            if self.state == self.COMMENT:
+                break
+            if self.state == self.STRING:
+                end = chunk.find('"', pos)
+                if end < 0:
+                    break
+                pos = safe = end + 1
+                self.state = self.CODE
+            elif self.state == self.SLASH:
+                if chunk[pos] == '/':
+                    self.state = self.COMMENT
+                    pos += 1
+                else:
+                    self.state = self.CODE
+            else:
+                match = self.SPECIAL.search(chunk, pos)
+                end = match.start() if match else len(chunk)
+                last = max(chunk.rfind(c, pos, end) for c in self.DELIMITERS)
+                if last >= 0:
+                    safe = last + 1
+                if end < len(chunk):
+                    self.state = self.SLASH if chunk[end] == '/' else self.STRING
+                pos = end + 1
+        return safe
+    
+    def _next_piece(self):
+        """Передача лексеру следующего куска, заканчивающегося на границе токенов."""
+        while not self.finished:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.finished = True
+                piece = ''.join(self.pending)
+                self.pending = []
+            else:
+                self.size += len(chunk.encode('utf-8'))
+                self.chars += len(chunk)
+                if self.limits is not None:
+                    self.limits.check_input_size(self.size)
+                # После перевода строки строки и комментарии закончены
+                cut = chunk.rfind('\n') + 1
+                if cut:
+                    self.state = self.CODE
+                cut = max(cut, self._scan(chunk, cut))
+                if cut <= 0:
+                    self.pending.append(chunk)
+                    continue
+                self.pending.append(chunk[:cut])
+                piece = ''.join(self.pending)
+                self.pending = [chunk[cut:]] if cut < len(chunk) else []
+            if piece:
+                newline = self.lexdata.rfind('\n')
+                if newline >= 0:
+                    self.line_start = self.offset + newline + 1
+                self.offset += len(self.lexdata)
+                self.lexdata = piece
+                self.lexer.input(piece)
+                return True
+        return False
+    
+    def token(self):
+        """Получение следующего токена или None в конце текста."""
+        while True:
+            tok = self.lexer.token()
+            if tok is not None:
+                break
+            if not self._next_piece():
+                return None
+        line_start = self.lexdata.rfind('\n', 0, tok.lexpos) + 1
+        if line_start:
+            tok.column = tok.lexpos - line_start + 1
+        else:
+            tok.column = self.offset + tok.lexpos - self.line_start + 1
+        tok.lexpos += self.offset
+        self.lineno = tok.lineno
+        self.lexpos = self.offset + self.lexer.lexpos
+        return tok
 
 
 # Функция для тестирования лексера
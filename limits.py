@@ -0,0 +1,76 @@
+class ExpansionLimitError(Exception):
+    """Превышение ограничения на размер конфигурации после раскрытия ссылок."""
+
+
+class ExpansionLimits:
+    """
+    Ограничения на размер входа и результата трансляции.
+    
+    Ссылки .(имя). раскрываются по значению, поэтому небольшой файл с
+    таблицами, ссылающимися на предыдущие таблицы, может раскрыться
+    в экспоненциально большой результат. Ограничения проверяются по ходу
+    разбора и генерации; None означает отсутствие ограничения.
+    """
+    
+    def __init__(self, max_input_bytes=64 * 1024 * 1024,
+                 max_output_bytes=256 * 1024 * 1024,
+                 max_nodes=10_000_000, max_depth=100):
+        """
+        Инициализация ограничений.
+        
+        Args:
+            max_input_bytes: Размер входного текста в байтах UTF-8
+            max_output_bytes: Размер результата в байтах
+            max_nodes: Число узлов (чисел и таблиц) после раскрытия ссылок
+            max_depth: Глубина вложенности таблиц после раскрытия ссылок
+        """
+        self.max_input_bytes = max_input_bytes
+        self.max_output_bytes = max_output_bytes
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+    
+    @classmethod
+    def unlimited(cls):
+        """Ограничения, которые никогда не срабатывают."""
+        return cls(None, None, None, None)
+    
+    def check_input(self, data):
+        """Проверка размера входного текста."""
+        limit = self.max_input_bytes
+        # Байтов в UTF-8 не меньше числа символов и не больше чем в 4 раза
+        if limit is None or len(data) * 4 <= limit:
+            return
+        self.check_input_size(len(data) if len(data) > limit else len(data.encode('utf-8')))
+    
+    def check_input_size(self, size):
+        """Проверка числа уже прочитанных байт входа."""
+        if self.max_input_bytes is not None and size > self.max_input_bytes:
+            raise ExpansionLimitError(
+                f"Превышен размер входных данных: {size} > {self.max_input_bytes} байт")
+    
+    def check_nodes(self, nodes, source_nodes):
+        """Проверка числа узлов после раскрытия ссылок."""
+        if self.max_nodes is not None and nodes > self.max_nodes:
+            raise ExpansionLimitError(
+                f"Превышено число узлов после раскрытия ссылок: "
+                f"{nodes} > {self.max_nodes} "
+                f"(коэффициент расширения {expansion_ratio(nodes, source_nodes)})")
+    
+    def check_depth(self, depth):
+        """Проверка глубины вложенности после раскрытия ссылок."""
+        if self.max_depth is not None and depth > self.max_depth:
+            raise ExpansionLimitError(
+                f"Превышена глубина вложенности после раскрытия ссылок: "
+                f"{depth} > {self.max_depth}")
+    
+    def check_output(self, output_bytes, input_bytes):
+        """Проверка размера результата."""
+        if self.max_output_bytes is not None and output_bytes > self.max_output_bytes:
+            raise ExpansionLimitError(
+                f"Превышен размер результата: {output_bytes} > {self.max_output_bytes} байт "
+                f"(коэффициент расширения {expansion_ratio(output_bytes, input_bytes)})")
+
+
+def expansion_ratio(expanded, source):
+    """Отношение размера после раскрытия к исходному в виде строки 'N.Nx'."""
+    return f"{expanded / max(source, 1):.1f}x"
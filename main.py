@@ -1,8 +1,12 @@
 import argparse
 import sys
 import os
+import time
 
-from translator import TomlTranslator
+from limits import ExpansionLimits
+from sources import READ_ERRORS, iter_chunks, open_source
+from translator import TomlTranslator, INT_FORMATS, EMIT_FORMATS
+from validator import ConfigValidator, check_files
 
 
 def main():
@@ -19,17 +23,25 @@ def main():
   - Объявление константы: имя: значение;
   - Вычисление константы: .(имя).
   - Комментарии: // текст комментария
+  - Подключение файла: include "путь";
 
 Примеры:
   python main.py --input examples/server_config.txt
   python main.py -i examples/database_config.txt
+  python main.py --check -i examples/*.txt
+  python main.py -i examples/server_config.txt --profile /tmp/server
+  python main.py -i examples/server_config.txt --emit inline,sections=server.toml,json=server.json
+  gzip -c examples/server_config.txt | python main.py -i -
+  python main.py -i examples/server_config.txt --format pymodule > server_config.py
         """
     )
     
     arg_parser.add_argument(
         '-i', '--input',
         required=True,
-        help='Путь к входному файлу с конфигурацией'
+        nargs='+',
+        help='Путь к входному файлу с конфигурацией (в режиме --check - один или несколько); '
+             'сжатые .gz/.xz/.bz2 распознаются автоматически, - означает стандартный ввод'
     )
     
     arg_parser.add_argument(
@@ -38,36 +50,191 @@ def main():
         help='Использовать секции TOML для таблиц (вместо инлайн-таблиц)'
     )
     
+    arg_parser.add_argument(
+        '--int-format',
+        choices=INT_FORMATS,
+        default='dec',
+        help='Запись чисел в TOML: dec (по умолчанию), hex (0x...) или bin (0b...)'
+    )
+    
+    arg_parser.add_argument(
+        '--format',
+        choices=('toml', 'pymodule'),
+        default='toml',
+        help='Формат результата: toml (по умолчанию) или pymodule - модуль Python '
+             'с готовыми значениями только для чтения'
+    )
+    
+    arg_parser.add_argument(
+        '--emit',
+        metavar='FORMATS',
+        help='Форматы вывода за один разбор через запятую: inline, sections, json, pymodule; '
+             'формат=путь записывает результат в файл (например inline,json=out.json)'
+    )
+    
+    arg_parser.add_argument(
+        '--profile',
+        metavar='OUT',
+        help='Профилировать трансляцию: записать OUT.pstats и OUT.collapsed (для flamegraph)'
+    )
+    
+    defaults = ExpansionLimits()
+    for option, attr, what in [
+        ('--max-input-bytes', 'max_input_bytes', 'размер входного файла, байт'),
+        ('--max-output-bytes', 'max_output_bytes', 'размер результата, байт'),
+        ('--max-nodes', 'max_nodes', 'число узлов после раскрытия ссылок'),
+        ('--max-depth', 'max_depth', 'глубина вложенности после раскрытия ссылок'),
+    ]:
+        arg_parser.add_argument(
+            option,
+            type=int,
+            metavar='N',
+            default=getattr(defaults, attr),
+            help=f'Ограничение: {what} (по умолчанию %(default)s, 0 - без ограничения)'
+        )
+    
+    arg_parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='Вывести размеры и коэффициент расширения в stderr'
+    )
+    
+    arg_parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Только проверить синтаксис и ссылки на константы, без генерации TOML'
+    )
+    
     args = arg_parser.parse_args()
     
-    # Проверка существования файла
-    if not os.path.exists(args.input):
-        print(f"Ошибка: файл '{args.input}' не найден", file=sys.stderr)
-        sys.exit(1)
+    # Проверка существования файлов ('-' - стандартный ввод)
+    for path in args.input:
+        if path != '-' and not os.path.exists(path):
+            print(f"Ошибка: файл '{path}' не найден", file=sys.stderr)
+            sys.exit(1)
     
-    # Чтение входного файла
-    try:
-        with open(args.input, 'r', encoding='utf-8') as f:
-            input_text = f.read()
-    except IOError as e:
-        print(f"Ошибка чтения файла: {e}", file=sys.stderr)
-        sys.exit(1)
+    limits = ExpansionLimits(
+        max_input_bytes=args.max_input_bytes or None,
+        max_output_bytes=args.max_output_bytes or None,
+        max_nodes=args.max_nodes or None,
+        max_depth=args.max_depth or None,
+    )
     
-    # Создание транслятора и трансляция
-    translator = TomlTranslator()
+    if args.check:
+        check(args.input, limits)
+        return
     
-    if args.sections:
-        toml_output, errors = translator.translate_to_sections(input_text)
+    if len(args.input) > 1:
+        arg_parser.error('несколько входных файлов допускаются только с --check')
+    input_path = args.input[0]
+    
+    if args.profile and (args.emit or args.format != 'toml'):
+        arg_parser.error('--profile поддерживает только вывод TOML (без --emit и --format)')
+    if args.sections and (args.emit or args.format != 'toml'):
+        arg_parser.error('-s/--sections не используется с --emit и --format pymodule; '
+                         'для --emit укажите формат sections')
+    
+    if args.emit:
+        try:
+            destinations = parse_emit(args.emit)
+        except ValueError as e:
+            arg_parser.error(str(e))
+    elif args.format == 'pymodule':
+        destinations = [('pymodule', None)]
     else:
-        toml_output, errors = translator.translate(input_text)
+        destinations = [('sections' if args.sections else 'inline', None)]
+    formats = {fmt for fmt, _ in destinations}
+    filename = None if input_path == '-' else input_path
+    
+    # Создание транслятора и трансляция по мере чтения входного файла
+    translator = TomlTranslator(int_format=args.int_format, limits=limits)
+    
+    try:
+        with open_source(input_path) as source:
+            if args.profile:
+                toml_output, errors, pstats_path, collapsed_path = translator.profile(
+                    source.read(), args.profile, sections=args.sections, filename=filename)
+                outputs = {destinations[0][0]: toml_output}
+                print(f"Профиль записан: {pstats_path}, {collapsed_path}", file=sys.stderr)
+            else:
+                outputs, errors = translator.translate_chunks(
+                    iter_chunks(source), formats, filename=filename)
+    except READ_ERRORS as e:
+        print(f"Ошибка чтения файла: {e}", file=sys.stderr)
+        sys.exit(1)
     
     # Вывод результатов
     if errors:
         for error in errors:
             print(f"Ошибка: {error}", file=sys.stderr)
         sys.exit(1)
-    else:
-        print(toml_output)
+    write_outputs(outputs, destinations)
+    
+    if args.stats:
+        stats = translator.get_stats()
+        print(f"Вход: {stats['input_size']} символов, {stats['source_nodes']} узлов; "
+              f"результат: {stats['output_size']} символов, {stats['expanded_nodes']} узлов, "
+              f"глубина {stats['depth']}; коэффициент расширения {stats['ratio']:.1f}x",
+              file=sys.stderr)
+
+
+def parse_emit(value):
+    """
+    Разбор значения --emit.
+    
+    Returns:
+        Список пар (формат, путь); путь None означает стандартный вывод
+    """
+    destinations = []
+    for item in value.split(','):
+        fmt, sep, path = item.strip().partition('=')
+        if fmt not in EMIT_FORMATS:
+            raise ValueError(f"неизвестный формат вывода '{fmt}' "
+                             f"(допустимо: {', '.join(EMIT_FORMATS)})")
+        if sep and not path:
+            raise ValueError(f"не указан путь для формата '{fmt}'")
+        destinations.append((fmt, path or None))
+    return destinations
+
+
+def write_outputs(outputs, destinations):
+    """Запись результатов translate_many в файлы и стандартный вывод."""
+    printed = False
+    for fmt, path in destinations:
+        if path is None:
+            if printed:
+                print()
+            print(outputs[fmt])
+            printed = True
+            continue
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(outputs[fmt] + '\n')
+        except IOError as e:
+            print(f"Ошибка записи файла: {e}", file=sys.stderr)
+            sys.exit(1)
+
+
+def check(paths, limits=None):
+    """Проверка файлов в режиме --check с выводом скорости."""
+    start = time.perf_counter()
+    validator = ConfigValidator(limits=limits)
+    validator.build(debug=False, write_tables=False)
+    results = check_files(paths, validator)
+    elapsed = time.perf_counter() - start
+    
+    failed = 0
+    for path, errors in results:
+        if errors:
+            failed += 1
+            for error in errors:
+                print(f"{path}: Ошибка: {error}", file=sys.stderr)
+    
+    rate = len(results) / elapsed if elapsed > 0 else float('inf')
+    print(f"Проверено файлов: {len(results)}, с ошибками: {failed}, "
+          f"время: {elapsed:.3f} с ({rate:.1f} файлов/с)")
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
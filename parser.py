@@ -1,12 +1,54 @@
+import os
+from collections import namedtuple
+
 import ply.yacc as yacc
 from lexer import ConfigLexer
+from limits import ExpansionLimits, ExpansionLimitError
+
+
+# Положение имени в исходном тексте: строки и столбцы нумеруются с 1,
+# end_column указывает на символ после имени
+Span = namedtuple('Span', ['line', 'column', 'end_line', 'end_column'])
+
+# Начало сообщения об ошибке неизвестной константы
+UNKNOWN_CONSTANT = "Неизвестная константа"
+
+
+# Кэш подключаемых файлов на время работы процесса:
+# абсолютный путь -> (зависимости, таблица констант, ошибки), где
+# зависимости - словарь путь -> (mtime_ns, размер) для самого файла
+# и всех файлов, подключенных из него напрямую или через другие файлы
+_include_cache = {}
+
+
+def clear_include_cache():
+    """Очистка кэша подключаемых файлов."""
+    _include_cache.clear()
+
+
+def _dependencies_unchanged(dependencies):
+    """Проверка, что ни один файл из dependencies не изменился."""
+    for path, signature in dependencies.items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) != signature:
+            return False
+    return True
 
 
 class ConfigParser:
     """Парсер для учебного конфигурационного языка."""
     
-    def __init__(self):
-        """Инициализация парсера."""
+    def __init__(self, limits=None):
+        """
+        Инициализация парсера.
+        
+        Args:
+            limits: Ограничения ExpansionLimits (по умолчанию стандартные)
+        """
+        self.limits = limits if limits is not None else ExpansionLimits()
         self.lexer = ConfigLexer()
         self.lexer.build()
         self.tokens = self.lexer.tokens
@@ -14,6 +56,22 @@ class ConfigParser:
         self.errors = []
         self.constants = {}  # Хранилище констант
         self.result = []     # Результат разбора
+        self.filename = None       # Абсолютный путь к разбираемому файлу
+        self.include_stack = ()    # Файлы, подключившие текущий
+        self.dependencies = {}     # Подключенные файлы: путь -> (mtime_ns, размер)
+        self.definitions = []      # Объявления констант: (имя, Span)
+        self.references = []       # Ссылки на константы: (имя, Span)
+        self.statement_starts = [] # Начала инструкций (строка, столбец)
+        self.tracking = False
+        self.limit_error = None    # ExpansionLimitError, прервавшая разбор этого
+                                   # или подключенного файла
+        self.build_kwargs = {}
+        self._include_parser = None  # Парсер подключаемых файлов, один на все директивы
+        self.input_size = 0        # Размер разобранного текста в символах
+        self.source_nodes = 0      # Узлы, записанные в тексте
+        self.expanded_nodes = 0    # Узлы констант после раскрытия ссылок
+        self.expanded_depth = 0    # Наибольшая глубина после раскрытия
+        self._measured = {}        # id узла -> (узел, число узлов, глубина)
     
     # Правила грамматики
     
@@ -26,10 +84,10 @@ class ConfigParser:
                       | statement
                       | empty"""
         if len(p) == 3:
-            if p[1] is None:
-                p[0] = [p[2]] if p[2] is not None else []
-            else:
-                p[0] = p[1] + ([p[2]] if p[2] is not None else [])
+            # Дописываем в уже построенный список, чтобы разбор был линейным
+            p[0] = p[1] if p[1] is not None else []
+            if p[2] is not None:
+                p[0].append(p[2])
         elif p[1] is not None:
             p[0] = [p[1]]
         else:
@@ -37,21 +95,42 @@ class ConfigParser:
     
     def p_statement(self, p):
         """statement : const_declaration
+                     | include
                      | value"""
         p[0] = p[1]
+        if self.tracking:
+            lexpos = p.lexpos(1)
+            column = ConfigLexer.find_column(p.lexer.lexdata, lexpos)
+            self.statement_starts.append((p.lineno(1), column))
     
     def p_const_declaration(self, p):
         """const_declaration : NAME COLON value SEMICOLON"""
         name = p[1]
         value = p[3]
         self.constants[name] = value
+        self.definitions.append((name, self._span(p, 1)))
+        self._count_constant(value)
         p[0] = ('const_decl', name, value)
     
+    def p_include(self, p):
+        """include : INCLUDE STRING SEMICOLON"""
+        path = self._resolve_include(p[2])
+        constants, errors = self._load_include(path)
+        self.errors.extend(errors)
+        # Константы подключенного файла ведут себя так, как если бы
+        # его текст был вставлен на место директивы. Сам файл разбирается
+        # отдельно и не видит констант подключающего файла
+        self.constants.update(constants)
+        for value in constants.values():
+            self._count_constant(value)
+        p[0] = ('include', path)
+    
     def p_value(self, p):
         """value : BINARY_NUMBER
                  | table
                  | const_ref"""
         p[0] = p[1]
+        self.source_nodes += 1
     
     def p_table(self, p):
         """table : TABLE LPAREN LBRACKET table_items RBRACKET RPAREN
@@ -60,6 +139,10 @@ class ConfigParser:
             p[0] = ('table', p[4])
         else:
             p[0] = ('table', [])
+        # Проверяем размер таблицы сразу, не дожидаясь конца объявления
+        nodes, depth = self._measure(p[0])
+        self.limits.check_depth(depth)
+        self.limits.check_nodes(nodes, self.source_nodes)
     
     def p_table_items(self, p):
         """table_items : table_items COMMA table_item
@@ -76,10 +159,11 @@ class ConfigParser:
     def p_const_ref(self, p):
         """const_ref : DOT LPAREN NAME RPAREN DOT"""
         name = p[3]
+        self.references.append((name, self._span(p, 3)))
         if name in self.constants:
             p[0] = ('const_ref', name, self.constants[name])
         else:
-            error_msg = f"Неизвестная константа: {name}"
+            error_msg = f"{UNKNOWN_CONSTANT}: {name}"
             self.errors.append(error_msg)
             p[0] = ('const_ref', name, None)
     
@@ -96,27 +180,244 @@ class ConfigParser:
             error_msg = "Ошибка синтаксиса: неожиданный конец файла"
             self.errors.append(error_msg)
     
+    def _span(self, p, n):
+        """Положение токена NAME с номером n в правиле."""
+        line = p.lineno(n)
+        # Токены StreamLexer хранят столбец: их кусок текста уже мог смениться
+        column = getattr(p.slice[n], 'column', None)
+        if column is None:
+            column = ConfigLexer.find_column(p.lexer.lexdata, p.lexpos(n))
+        return Span(line, column, line, column + len(p[n]))
+    
+    def _measure(self, value):
+        """
+        Размер значения после раскрытия ссылок.
+        
+        Результаты запоминаются для каждого узла, поэтому значение
+        константы, на которую много ссылок, измеряется один раз.
+        
+        Returns:
+            Кортеж (число узлов, глубина вложенности таблиц)
+        """
+        if not isinstance(value, tuple):
+            return 1, 0
+        cached = self._measured.get(id(value))
+        if cached is not None and cached[0] is value:
+            return cached[1], cached[2]
+        
+        if value[0] == 'table':
+            nodes, depth = 1, 1
+            for _, item in value[1]:
+                item_nodes, item_depth = self._measure(item)
+                nodes += item_nodes
+                depth = max(depth, item_depth + 1)
+        elif value[0] == 'const_ref' and value[2] is not None:
+            nodes, depth = self._measure(value[2])
+        else:
+            nodes, depth = 1, 0
+        self._measured[id(value)] = (value, nodes, depth)
+        return nodes, depth
+    
+    def _count_constant(self, value):
+        """Учет константы, которая будет выведена в результат."""
+        self._count_size(*self._measure(value))
+    
+    def _count_size(self, nodes, depth):
+        """Учет размера константы после раскрытия ссылок с проверкой ограничений."""
+        self.expanded_nodes += nodes
+        self.expanded_depth = max(self.expanded_depth, depth)
+        self.limits.check_depth(depth)
+        self.limits.check_nodes(self.expanded_nodes, self.source_nodes)
+    
+    def _resolve_include(self, path):
+        """Получение абсолютного пути подключаемого файла."""
+        if self.filename is not None:
+            base_dir = os.path.dirname(self.filename)
+        else:
+            base_dir = os.getcwd()
+        return os.path.abspath(os.path.join(base_dir, path))
+    
+    def _load_include(self, path):
+        """
+        Получение таблицы констант подключаемого файла.
+        
+        Каждый файл разбирается один раз за время работы процесса,
+        повторно - только если изменились mtime или размер его самого
+        или любого файла, подключенного из него (в том числе косвенно).
+        Все использованные файлы добавляются в self.dependencies.
+        
+        Args:
+            path: Абсолютный путь к файлу
+            
+        Returns:
+            Кортеж (constants, errors)
+        """
+        stack = self.include_stack
+        if self.filename is not None:
+            stack += (self.filename,)
+        if path in stack:
+            chain = ' -> '.join(stack + (path,))
+            return {}, [f"Циклическое подключение файлов: {chain}"]
+        
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            return {}, [f"Не удалось подключить файл '{path}': {e.strerror}"]
+        
+        cached = _include_cache.get(path)
+        if cached is not None and _dependencies_unchanged(cached[0]):
+            self.dependencies.update(cached[0])
+            return cached[1], cached[2]
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = f.read()
+        except (IOError, UnicodeDecodeError) as e:
+            return {}, [f"Не удалось подключить файл '{path}': {e}"]
+        
+        child = self._include_parser
+        if child is None:
+            # Грамматика уже проверена при построении этого парсера,
+            # поэтому предупреждения PLY повторно не выводятся
+            child = self._include_parser = ConfigParser(limits=self.limits)
+            child.build(**dict(self.build_kwargs, errorlog=yacc.NullLogger()))
+        child.limits = self.limits
+        child.include_stack = stack
+        child.parse(data, filename=path)
+        constants = child.get_constants()
+        errors = [f"{path}: {error}" for error in child.get_errors()]
+        if self.limit_error is None:
+            self.limit_error = child.limit_error
+        dependencies = {path: (stat.st_mtime_ns, stat.st_size)}
+        dependencies.update(child.dependencies)
+        self.dependencies.update(dependencies)
+        
+        # Файлы с циклом не кэшируем: результат зависит от цепочки подключений.
+        # Разбор, прерванный ограничением, тоже: он зависит от ExpansionLimits
+        # и оставляет неполную таблицу констант
+        cyclic = any("Циклическое подключение" in error for error in errors)
+        if not cyclic and child.limit_error is None:
+            _include_cache[path] = (dependencies, constants, errors)
+        return constants, errors
+    
     def build(self, **kwargs):
         """Построение парсера."""
+        self.build_kwargs = kwargs
+        self._include_parser = None
         self.parser = yacc.yacc(module=self, **kwargs)
         return self.parser
     
-    def parse(self, data):
-        """Разбор входных данных."""
-        self.errors = []
-        self.constants = {}
-        self.lexer.input(data)
-        result = self.parser.parse(data, lexer=self.lexer.lexer)
+    def parse(self, data, filename=None, tracking=False):
+        """
+        Разбор входных данных.
+        
+        Args:
+            data: Текст на учебном конфигурационном языке
+            filename: Путь к разбираемому файлу; относительно его каталога
+                ищутся файлы из директив include
+            tracking: Запоминать начала инструкций верхнего уровня
+                (нужно для индекса символов)
+        """
+        self._reset(filename, tracking)
+        self.input_size = len(data)
+        try:
+            self.limits.check_input(data)
+            self.lexer.input(data)
+            result = self.parser.parse(data, lexer=self.lexer.lexer, tracking=tracking)
+        except ExpansionLimitError as e:
+            self.limit_error = e
+            self.errors.append(str(e))
+            return None
         
         # Добавляем ошибки лексера
         self.errors.extend(self.lexer.errors)
         
         return result
     
+    def parse_buffer(self, buffer, filename=None, tracking=False):
+        """
+        Разбор токенов из TokenBuffer без повторного лексического анализа.
+        
+        Args:
+            buffer: Результат ConfigLexer.get_token_buffer()
+            filename: Путь к разбираемому файлу (для директив include)
+            tracking: Запоминать начала инструкций верхнего уровня
+        """
+        self._reset(filename, tracking)
+        self.input_size = len(buffer.data)
+        try:
+            self.limits.check_input(buffer.data)
+            result = self.parser.parse(lexer=buffer.reader(), tracking=tracking)
+        except ExpansionLimitError as e:
+            self.limit_error = e
+            self.errors.append(str(e))
+            return None
+        self.errors.extend(buffer.errors)
+        return result
+    
+    def parse_stream(self, chunks, filename=None):
+        """
+        Разбор текста, поступающего частями, без чтения его целиком.
+        
+        Args:
+            chunks: Итератор строк (например, sources.iter_chunks())
+            filename: Путь к разбираемому файлу (для директив include)
+        """
+        self._reset(filename, False)
+        stream = self.lexer.stream(chunks, self.limits)
+        try:
+            result = self.parser.parse(lexer=stream)
+        except ExpansionLimitError as e:
+            self.limit_error = e
+            self.errors.append(str(e))
+            return None
+        finally:
+            self.input_size = stream.chars
+        self.errors.extend(stream.errors)
+        return result
+    
+    def _reset(self, filename, tracking):
+        """Сброс состояния перед разбором."""
+        self.errors = []
+        self.limit_error = None
+        self.constants = {}
+        self.definitions = []
+        self.references = []
+        self.statement_starts = []
+        self.tracking = tracking
+        self.filename = os.path.abspath(filename) if filename is not None else None
+        self.dependencies = {}
+        self.source_nodes = 0
+        self.expanded_nodes = 0
+        self.expanded_depth = 0
+        self._measured = {}
+    
     def get_constants(self):
         """Получение словаря констант."""
         return self.constants
     
+    def get_definitions(self):
+        """Получение списка объявлений констант (имя, Span)."""
+        return self.definitions
+    
+    def get_references(self):
+        """Получение списка ссылок на константы (имя, Span)."""
+        return self.references
+    
+    def get_expansion(self):
+        """
+        Размеры последней разобранной конфигурации.
+        
+        Returns:
+            Словарь с числом узлов в тексте (source_nodes), после
+            раскрытия ссылок (expanded_nodes) и глубиной (depth)
+        """
+        return {
+            'source_nodes': self.source_nodes,
+            'expanded_nodes': self.expanded_nodes,
+            'depth': self.expanded_depth,
+        }
+    
     def get_errors(self):
         """Получение списка ошибок."""
         return self.errors
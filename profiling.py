@@ -0,0 +1,176 @@
+import marshal
+import os
+import sys
+import time
+
+
+def phase_label(code):
+    """
+    Подпись кадра с указанием этапа обработки.
+    
+    Правила лексера получают префикс lexer:, действия грамматики -
+    grammar:, функции транслятора - render:, код PLY - ply:.
+    Остальные функции подписываются как python:модуль.имя, чтобы их
+    нельзя было спутать с этапами.
+    """
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    name = code.co_name
+    if module == 'lexer' and name.startswith('t_'):
+        return f"lexer:{name}"
+    if module in ('parser', 'validator') and name.startswith('p_'):
+        return f"grammar:{name}"
+    if module == 'translator':
+        return f"render:{name}"
+    if os.path.basename(os.path.dirname(code.co_filename)) == 'ply':
+        return f"ply:{module}.{name}"
+    return f"python:{module}.{name}"
+
+
+def _builtin_key(func):
+    """Ключ встроенной функции в формате, который использует cProfile."""
+    owner = getattr(func, '__self__', None)
+    if owner is None or isinstance(owner, type(sys)):
+        module = getattr(func, '__module__', None) or 'builtins'
+        return ('~', 0, f"<built-in method {module}.{func.__name__}>")
+    return ('~', 0, f"<method '{func.__name__}' of '{type(owner).__name__}' objects>")
+
+
+class StackProfiler:
+    """
+    Сбор собственного времени функций по полным стекам вызовов.
+    
+    Результат записывается в формате collapsed stacks
+    ("кадр;кадр;кадр время_мкс"), который принимают flamegraph.pl,
+    speedscope и аналогичные инструменты. Из тех же событий строится
+    статистика в формате pstats, поэтому оба файла описывают один запуск.
+    """
+    
+    def __init__(self):
+        """Инициализация профилировщика."""
+        self.stacks = {}  # Кортеж подписей -> собственное время, нс
+        self.functions = {}  # Ключ pstats -> [cc, nc, tt, ct, {вызывающий: [nc, cc, tt, ct]}]
+        self._frames = []  # [подпись, ключ pstats, вызывающий, начало, время вложенных вызовов]
+        self._active = {}  # Ключ pstats или (вызывающий, ключ) -> число незавершенных вызовов
+        self._labels = {}  # Кэш (подпись, ключ) по объектам кода
+    
+    def _callback(self, frame, event, arg):
+        """Обработчик событий sys.setprofile."""
+        if event == 'call':
+            code = frame.f_code
+            cached = self._labels.get(code)
+            if cached is None:
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                cached = self._labels[code] = (phase_label(code), key)
+            self._enter(*cached)
+        elif event == 'c_call':
+            cached = self._labels.get(arg)
+            if cached is None:
+                name = getattr(arg, '__qualname__', arg.__name__)
+                cached = self._labels[arg] = (f"builtin:{name}", _builtin_key(arg))
+            self._enter(*cached)
+        elif event in ('return', 'c_return', 'c_exception') and self._frames:
+            self._leave()
+    
+    def _enter(self, label, key):
+        """Начало вызова."""
+        caller = self._frames[-1][1] if self._frames else None
+        self._active[key] = self._active.get(key, 0) + 1
+        edge = (caller, key)
+        self._active[edge] = self._active.get(edge, 0) + 1
+        self._frames.append([label, key, caller, time.perf_counter_ns(), 0])
+    
+    def _leave(self):
+        """Завершение вызова с учетом времени в обоих представлениях."""
+        now = time.perf_counter_ns()
+        stack = tuple(entry[0] for entry in self._frames)
+        label, key, caller, start, children = self._frames.pop()
+        elapsed = now - start
+        own = elapsed - children
+        self.stacks[stack] = self.stacks.get(stack, 0) + own
+        if self._frames:
+            self._frames[-1][4] += elapsed
+        
+        # Как и в cProfile, для рекурсивных вызовов полное время учитывается
+        # только у внешнего вызова функции (и, отдельно, пары вызывающий-вызванный)
+        entry = self.functions.get(key)
+        if entry is None:
+            entry = self.functions[key] = [0, 0, 0, 0, {}]
+        self._active[key] -= 1
+        entry[1] += 1
+        entry[2] += own
+        if self._active[key] == 0:
+            entry[0] += 1
+            entry[3] += elapsed
+        
+        if caller is None:
+            return
+        edge = entry[4].get(caller)
+        if edge is None:
+            edge = entry[4][caller] = [0, 0, 0, 0]
+        self._active[caller, key] -= 1
+        edge[0] += 1
+        edge[2] += own
+        if self._active[caller, key] == 0:
+            edge[1] += 1
+            edge[3] += elapsed
+    
+    def run(self, func, *args, **kwargs):
+        """Вызов func под профилировщиком."""
+        sys.setprofile(self._callback)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sys.setprofile(None)
+            self._frames = []
+            self._active = {}
+    
+    def collapsed(self):
+        """Строки в формате collapsed stacks (время в микросекундах)."""
+        lines = []
+        for key, nanoseconds in sorted(self.stacks.items()):
+            microseconds = nanoseconds // 1000
+            if microseconds > 0:
+                lines.append(f"{';'.join(key)} {microseconds}")
+        return lines
+    
+    def pstats(self):
+        """Статистика в формате, который читает модуль pstats (время в секундах)."""
+        stats = {}
+        for key, (cc, nc, tt, ct, callers) in self.functions.items():
+            stats[key] = (cc, nc, tt / 1e9, ct / 1e9, {
+                caller: (enc, ecc, ett / 1e9, ect / 1e9)
+                for caller, (enc, ecc, ett, ect) in callers.items()})
+        return stats
+
+
+def profile_call(func, output, *args, **kwargs):
+    """
+    Профилирование вызова func с записью результатов.
+    
+    Функция вызывается один раз под StackProfiler; файлы OUT.pstats и
+    OUT.collapsed строятся из одних и тех же событий.
+    
+    Args:
+        func: Профилируемая функция
+        output: Путь без расширения (расширение .pstats отбрасывается)
+        *args, **kwargs: Аргументы func
+    
+    Returns:
+        Кортеж (результат вызова, путь к .pstats, путь к .collapsed)
+    """
+    base, ext = os.path.splitext(output)
+    if ext not in ('.pstats', '.collapsed'):
+        base = output
+    
+    profiler = StackProfiler()
+    result = profiler.run(func, *args, **kwargs)
+    
+    pstats_path = base + '.pstats'
+    with open(pstats_path, 'wb') as f:
+        marshal.dump(profiler.pstats(), f)
+    collapsed_path = base + '.collapsed'
+    with open(collapsed_path, 'w', encoding='utf-8') as f:
+        for line in profiler.collapsed():
+            f.write(line + '\n')
+    
+    return result, pstats_path, collapsed_path
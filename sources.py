@@ -0,0 +1,98 @@
+import bz2
+import gzip
+import io
+import lzma
+import sys
+
+
+# Размер части текста, передаваемой лексеру (в символах)
+CHUNK_SIZE = 64 * 1024
+
+# Сигнатуры сжатых форматов
+_MAGIC = (
+    (b'\x1f\x8b', gzip.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+    (b'BZh', bz2.open),
+)
+
+# Число байт, достаточное для распознавания любой сигнатуры
+_HEADER_SIZE = max(len(magic) for magic, _ in _MAGIC)
+
+# Ошибки, которые могут возникнуть при чтении и распаковке
+READ_ERRORS = (OSError, EOFError, lzma.LZMAError, UnicodeDecodeError)
+
+
+def open_source(path):
+    """
+    Открытие входного файла как текстового потока.
+    
+    Сжатые файлы (.gz, .xz, .bz2) определяются по первым байтам и
+    распаковываются по мере чтения, без временных файлов.
+    
+    Args:
+        path: Путь к файлу или '-' для стандартного ввода
+    
+    Returns:
+        Текстовый поток в кодировке UTF-8
+    """
+    if path == '-':
+        raw = sys.stdin.buffer
+        # Из канала может прийти меньше байт, чем нужно для сигнатуры
+        header = b''
+        while len(header) < _HEADER_SIZE:
+            data = raw.read(_HEADER_SIZE - len(header))
+            if not data:
+                break
+            header += data
+        raw = io.BufferedReader(_PrefixedStream(header, raw))
+        opener = _detect(header)
+        if opener is not None:
+            raw = opener(raw)
+        return io.TextIOWrapper(raw, encoding='utf-8')
+    
+    with open(path, 'rb') as f:
+        opener = _detect(f.read(_HEADER_SIZE))
+    # Открытие по имени, чтобы при закрытии потока закрылся и файл
+    raw = opener(path, 'rb') if opener is not None else open(path, 'rb')
+    return io.TextIOWrapper(raw, encoding='utf-8')
+
+
+class _PrefixedStream(io.RawIOBase):
+    """Поток, отдающий сначала уже прочитанные байты, затем остаток stream."""
+    
+    def __init__(self, prefix, stream):
+        """Инициализация потока."""
+        self.prefix = prefix
+        self.stream = stream
+    
+    def readable(self):
+        """Поток доступен для чтения."""
+        return True
+    
+    def readinto(self, buffer):
+        """Чтение в buffer; возвращает число прочитанных байт."""
+        if self.prefix:
+            size = min(len(buffer), len(self.prefix))
+            buffer[:size] = self.prefix[:size]
+            self.prefix = self.prefix[size:]
+            return size
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _detect(header):
+    """Функция открытия сжатого потока по первым байтам или None."""
+    for magic, opener in _MAGIC:
+        if header.startswith(magic):
+            return opener
+    return None
+
+
+def iter_chunks(stream, size=CHUNK_SIZE):
+    """Чтение текстового потока частями по size символов."""
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        yield chunk
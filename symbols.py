@@ -0,0 +1,264 @@
+from bisect import bisect_right
+
+from parser import ConfigParser, Span, UNKNOWN_CONSTANT
+
+
+class _Block:
+    """
+    Группа соседних инструкций с общим отложенным сдвигом строк.
+    
+    Номер строки инструкции равен ее line плюс shift ее группы, поэтому
+    сдвиг всех инструкций группы выполняется одним сложением.
+    """
+    
+    __slots__ = ('shift', 'size')
+    
+    def __init__(self, shift, size):
+        self.shift = shift  # Сдвиг строк, еще не внесенный в инструкции
+        self.size = size    # Число инструкций в группе
+
+
+class _Statement:
+    """Инструкция верхнего уровня с положениями имен относительно ее начала."""
+    
+    __slots__ = ('line', 'column', 'block', 'definitions', 'references')
+    
+    def __init__(self, line, column):
+        self.line = line
+        self.column = column
+        self.block = None
+        self.definitions = []  # (имя, (смещение строки, столбец, длина))
+        self.references = []
+    
+    def start(self):
+        """Позиция начала инструкции (строка, столбец)."""
+        return (self.line + self.block.shift, self.column)
+    
+    def absolute(self, rel):
+        """Преобразование относительного положения в Span."""
+        dline, column, length = rel
+        if dline == 0:
+            column += self.column - 1
+        line = self.line + self.block.shift + dline
+        return Span(line, column, line, column + length)
+
+
+class SymbolIndex:
+    """
+    Индекс констант для перехода к объявлению и поиска ссылок.
+    
+    Положения имен хранятся относительно начала своей инструкции верхнего
+    уровня, поэтому при изменении одной инструкции заново разбирается
+    только ее текст, а у следующих инструкций сдвигается лишь начало.
+    Инструкции разбиты на группы по BLOCK_SIZE с общим сдвигом строк, так
+    что сдвиг занимает O(BLOCK_SIZE + число групп) вместо O(числа
+    инструкций). Поиск по имени выполняется через словарь, а записи имени
+    хранятся по инструкциям и удаляются за O(1).
+    """
+    
+    BLOCK_SIZE = 256
+    
+    def __init__(self, parser=None, filename=None):
+        """
+        Инициализация индекса.
+        
+        Args:
+            parser: Готовый ConfigParser (по умолчанию создается новый)
+            filename: Путь к индексируемому файлу (для директив include)
+        """
+        if parser is None:
+            parser = ConfigParser()
+            parser.build(debug=False, write_tables=False)
+        self.parser = parser
+        self.filename = filename
+        self.statements = []   # Инструкции в порядке следования в тексте
+        self.end = (1, 1)      # Позиция конца текста
+        self._blocks = []      # Группы инструкций в порядке следования
+        self._definitions = {}  # имя -> {инструкция: [относительное положение]}
+        self._references = {}
+    
+    def build(self, text):
+        """
+        Построение индекса по полному тексту.
+        
+        Returns:
+            Список синтаксических ошибок (пустой при успехе)
+        """
+        statements, errors = self._parse(text, (1, 1))
+        # Результат полного разбора освобождается сейчас, а не при первом
+        # изменении инструкции
+        self.parser.parse('')
+        if errors:
+            return errors
+        self.statements = statements
+        self.end = self._text_end(text, (1, 1))
+        self._blocks = []
+        for start in range(0, len(statements), self.BLOCK_SIZE):
+            block = _Block(0, len(statements[start:start + self.BLOCK_SIZE]))
+            for statement in statements[start:start + self.BLOCK_SIZE]:
+                statement.block = block
+            self._blocks.append(block)
+        self._definitions = {}
+        self._references = {}
+        for statement in statements:
+            self._register(statement)
+        return []
+    
+    def definition(self, name):
+        """Положение последнего объявления константы или None."""
+        entries = self._definitions.get(name)
+        if not entries:
+            return None
+        return max(statement.absolute(rel)
+                   for statement, rels in entries.items() for rel in rels)
+    
+    def references(self, name):
+        """Список положений ссылок на константу в порядке следования."""
+        entries = self._references.get(name, {})
+        return sorted(statement.absolute(rel)
+                      for statement, rels in entries.items() for rel in rels)
+    
+    def statement_range(self, index):
+        """
+        Область текста, относящаяся к инструкции с номером index.
+        
+        Область начинается с первого токена инструкции и заканчивается
+        перед первым токеном следующей (или в конце текста).
+        
+        Returns:
+            Пара позиций ((строка, столбец), (строка, столбец))
+        """
+        return self.statements[index].start(), self._region_end(index)
+    
+    def update_statement(self, index, new_text):
+        """
+        Замена текста инструкции с обновлением индекса.
+        
+        Args:
+            index: Номер инструкции верхнего уровня
+            new_text: Новый текст области statement_range(index); может
+                содержать несколько инструкций или быть пустым
+        
+        Returns:
+            Список синтаксических ошибок; при ошибках индекс не меняется
+        """
+        old = self.statements[index]
+        start = old.start()
+        old_end = self._region_end(index)
+        
+        statements, errors = self._parse(new_text, start)
+        if errors:
+            return errors
+        new_end = self._text_end(new_text, start)
+        
+        self._unregister(old)
+        for statement in statements:
+            self._register(statement)
+        
+        line_delta = new_end[0] - old_end[0]
+        column_delta = new_end[1] - old_end[1]
+        block = old.block
+        following = index + 1
+        # Инструкции на строке конца области сдвигаются и по столбцу
+        while following < len(self.statements):
+            statement = self.statements[following]
+            if statement.start()[0] != old_end[0]:
+                break
+            statement.column += column_delta
+            following += 1
+        # Остальные строки сдвигаются внутри своей группы напрямую,
+        # а в следующих группах - через общий сдвиг
+        following = index + 1
+        while following < len(self.statements) and self.statements[following].block is block:
+            self.statements[following].line += line_delta
+            following += 1
+        position = self._blocks.index(block)
+        for later in self._blocks[position + 1:]:
+            later.shift += line_delta
+        if self.end[0] == old_end[0]:
+            self.end = (self.end[0], self.end[1] + column_delta)
+        self.end = (self.end[0] + line_delta, self.end[1])
+        
+        for statement in statements:
+            statement.block = block
+            statement.line -= block.shift
+        self.statements[index:index + 1] = statements
+        block.size += len(statements) - 1
+        if block.size == 0:
+            del self._blocks[position]
+        elif block.size > 2 * self.BLOCK_SIZE:
+            self._split(block, position, index)
+        return []
+    
+    def _split(self, block, position, index):
+        """Разбиение переполненной группы, содержащей инструкцию index."""
+        first = index
+        while first > 0 and self.statements[first - 1].block is block:
+            first -= 1
+        members = self.statements[first:first + block.size]
+        parts = []
+        for start in range(0, len(members), self.BLOCK_SIZE):
+            part = _Block(block.shift, len(members[start:start + self.BLOCK_SIZE]))
+            for statement in members[start:start + self.BLOCK_SIZE]:
+                statement.block = part
+            parts.append(part)
+        self._blocks[position:position + 1] = parts
+    
+    def _parse(self, text, origin):
+        """Разбор текста, начинающегося в позиции origin."""
+        self.parser.parse(text, filename=self.filename, tracking=True)
+        errors = [error for error in self.parser.get_errors()
+                  if not error.startswith(UNKNOWN_CONSTANT)]
+        if errors:
+            return [], errors
+        
+        statements = [_Statement(line, column)
+                      for line, column in self.parser.statement_starts]
+        starts = self.parser.statement_starts
+        for names, attr in ((self.parser.get_definitions(), 'definitions'),
+                            (self.parser.get_references(), 'references')):
+            for name, span in names:
+                position = (span.line, span.column)
+                statement = statements[bisect_right(starts, position) - 1]
+                dline = span.line - statement.line
+                column = span.column - statement.column + 1 if dline == 0 else span.column
+                getattr(statement, attr).append(
+                    (name, (dline, column, span.end_column - span.column)))
+        
+        # Переносим инструкции из координат text в координаты документа
+        for statement in statements:
+            if statement.line == 1:
+                statement.column += origin[1] - 1
+            statement.line += origin[0] - 1
+        return statements, []
+    
+    def _region_end(self, index):
+        """Позиция конца области инструкции с номером index."""
+        if index + 1 < len(self.statements):
+            return self.statements[index + 1].start()
+        return self.end
+    
+    @staticmethod
+    def _text_end(text, origin):
+        """Позиция после text, если он начинается в позиции origin."""
+        newlines = text.count('\n')
+        if newlines == 0:
+            return (origin[0], origin[1] + len(text))
+        return (origin[0] + newlines, len(text) - text.rfind('\n'))
+    
+    def _register(self, statement):
+        """Добавление имен инструкции в словари индекса."""
+        for table, names in ((self._definitions, statement.definitions),
+                             (self._references, statement.references)):
+            for name, rel in names:
+                table.setdefault(name, {}).setdefault(statement, []).append(rel)
+    
+    def _unregister(self, statement):
+        """Удаление имен инструкции из словарей индекса."""
+        for table, names in ((self._definitions, statement.definitions),
+                             (self._references, statement.references)):
+            for name in {name for name, _ in names}:
+                entries = table[name]
+                del entries[statement]
+                if not entries:
+                    del table[name]
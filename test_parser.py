@@ -1,8 +1,24 @@
 
+import bz2
+import cProfile
+import importlib.util
+import gzip
+import io
+import json
+import lzma
+import pstats
+import tomllib
+import sys
+
 import pytest
 from lexer import ConfigLexer
-from parser import ConfigParser
-from translator import TomlTranslator
+from parser import ConfigParser, Span, clear_include_cache
+from translator import TomlTranslator, int_to_decimal
+from validator import ConfigValidator, check_files
+from symbols import SymbolIndex
+from profiling import StackProfiler
+from limits import ExpansionLimits
+from sources import iter_chunks, open_source
 
 
 class TestLexer:
@@ -59,6 +75,12 @@ class TestLexer:
         ]
         assert token_types == expected
     
+    def test_include_tokens(self):
+        """Тест распознавания директивы include."""
+        tokens = self.lexer.get_tokens('include "common/base.txt";')
+        assert [t.type for t in tokens] == ['INCLUDE', 'STRING', 'SEMICOLON']
+        assert tokens[1].value == 'common/base.txt'
+    
     def test_invalid_character(self):
         """Тест обработки недопустимых символов."""
         tokens = self.lexer.get_tokens("@invalid")
@@ -362,6 +384,910 @@ class TestRealWorldConfigs:
         assert len(errors) == 0
 
 
+class TestInclude:
+    """Тесты директивы include."""
+    
+    def setup_method(self):
+        """Настройка для каждого теста."""
+        clear_include_cache()
+        self.parser = ConfigParser()
+        self.parser.build(debug=False, write_tables=False)
+        self.translator = TomlTranslator()
+    
+    def test_include_constants(self, tmp_path):
+        """Тест использования констант из подключенного файла."""
+        (tmp_path / "common.txt").write_text("port: 0b1000;", encoding='utf-8')
+        main = tmp_path / "main.txt"
+        main.write_text('include "common.txt"; x: .(port).;', encoding='utf-8')
+        self.parser.parse(main.read_text(encoding='utf-8'), filename=str(main))
+        assert self.parser.get_errors() == []
+        assert self.parser.get_constants() == {'port': 8, 'x': ('const_ref', 'port', 8)}
+    
+    def test_same_output_as_pasted(self, tmp_path):
+        """Тест совпадения вывода с вставленным текстом."""
+        common = "base: 0b1;\nnet: table([ port = 0b1000, on = .(base). ]);\n"
+        rest = "server: table([ net = .(net)., id = 0b11 ]);\n"
+        (tmp_path / "common.txt").write_text(common, encoding='utf-8')
+        main = tmp_path / "main.txt"
+        main.write_text('include "common.txt";\n' + rest, encoding='utf-8')
+        
+        included, errors = self.translator.translate_to_sections(
+            main.read_text(encoding='utf-8'), filename=str(main))
+        pasted, _ = self.translator.translate_to_sections(common + rest)
+        assert errors == []
+        assert included == pasted
+    
+    def test_included_file_is_self_contained(self, tmp_path):
+        """Тест того, что подключенный файл не видит констант подключающего."""
+        inc = "b: table([ x = .(a). ]);"
+        (tmp_path / "inc.txt").write_text(inc, encoding='utf-8')
+        toml, errors = self.translator.translate(
+            'a: 0b1; include "inc.txt";', filename=str(tmp_path / "main.txt"))
+        assert errors == [f"{tmp_path / 'inc.txt'}: Неизвестная константа: a"]
+        # Тот же текст, вставленный вместо директивы, транслируется
+        assert self.translator.translate("a: 0b1; " + inc)[1] == []
+    
+    def test_include_parsed_once(self, tmp_path, monkeypatch):
+        """Тест повторного использования разобранного файла."""
+        (tmp_path / "common.txt").write_text("port: 0b1000;", encoding='utf-8')
+        text = 'include "common.txt"; include "common.txt";'
+        calls = []
+        original = ConfigParser.parse
+        
+        def counting_parse(parser, data, filename=None):
+            calls.append(filename)
+            return original(parser, data, filename=filename)
+        
+        monkeypatch.setattr(ConfigParser, 'parse', counting_parse)
+        self.parser.parse(text, filename=str(tmp_path / "a.txt"))
+        self.parser.parse(text, filename=str(tmp_path / "b.txt"))
+        assert calls.count(str(tmp_path / "common.txt")) == 1
+    
+    def test_include_parser_reused(self, tmp_path, monkeypatch, capsys):
+        """Тест того, что парсер подключаемых файлов строится один раз."""
+        for name in "abc":
+            (tmp_path / f"{name}.txt").write_text(f"{name}: 0b1;", encoding='utf-8')
+        (tmp_path / "d.txt").write_text('include "c.txt";', encoding='utf-8')
+        builds = []
+        original = ConfigParser.build
+        
+        def counting_build(parser, **kwargs):
+            builds.append(parser)
+            return original(parser, **kwargs)
+        
+        monkeypatch.setattr(ConfigParser, 'build', counting_build)
+        capsys.readouterr()
+        text = 'include "a.txt"; include "b.txt"; include "d.txt";'
+        self.parser.parse(text, filename=str(tmp_path / "main.txt"))
+        assert self.parser.get_errors() == []
+        assert sorted(self.parser.get_constants()) == ['a', 'b', 'c']
+        # Один парсер на каждую глубину подключения
+        assert len(builds) == 2
+        assert capsys.readouterr().err == ''
+    
+    def test_include_reparsed_after_change(self, tmp_path):
+        """Тест повторного разбора измененного файла."""
+        common = tmp_path / "common.txt"
+        main = str(tmp_path / "main.txt")
+        common.write_text("port: 0b1;", encoding='utf-8')
+        self.parser.parse('include "common.txt";', filename=main)
+        assert self.parser.get_constants()['port'] == 1
+        
+        common.write_text("port: 0b1111;", encoding='utf-8')
+        self.parser.parse('include "common.txt";', filename=main)
+        assert self.parser.get_constants()['port'] == 15
+    
+    def test_nested_include_reparsed_after_change(self, tmp_path):
+        """Тест повторного разбора после изменения файла через два подключения."""
+        deep = tmp_path / "c.txt"
+        (tmp_path / "b.txt").write_text('include "c.txt";', encoding='utf-8')
+        main = str(tmp_path / "main.txt")
+        deep.write_text("port: 0b1;", encoding='utf-8')
+        self.parser.parse('include "b.txt";', filename=main)
+        assert self.parser.get_constants()['port'] == 1
+        
+        deep.write_text("port: 0b1111;", encoding='utf-8')
+        self.parser.parse('include "b.txt";', filename=main)
+        assert self.parser.get_constants()['port'] == 15
+        assert set(self.parser.dependencies) == {
+            str(tmp_path / "b.txt"), str(deep)}
+    
+    def test_include_cycle(self, tmp_path):
+        """Тест обнаружения циклического подключения."""
+        (tmp_path / "a.txt").write_text('include "b.txt";', encoding='utf-8')
+        (tmp_path / "b.txt").write_text('include "a.txt";', encoding='utf-8')
+        self.parser.parse('include "b.txt";', filename=str(tmp_path / "a.txt"))
+        errors = self.parser.get_errors()
+        assert len(errors) == 1
+        assert "Циклическое подключение" in errors[0]
+    
+    def test_missing_include(self, tmp_path):
+        """Тест ошибки отсутствующего файла."""
+        self.parser.parse('include "missing.txt";', filename=str(tmp_path / "a.txt"))
+        errors = self.parser.get_errors()
+        assert len(errors) == 1
+        assert "missing.txt" in errors[0]
+
+
+class TestValidator:
+    """Тесты режима проверки без построения AST."""
+    
+    def setup_method(self):
+        """Настройка для каждого теста."""
+        clear_include_cache()
+        self.validator = ConfigValidator()
+        self.validator.build(debug=False, write_tables=False)
+    
+    def test_valid_config(self):
+        """Тест корректной конфигурации."""
+        input_text = """
+        port: 0b1000;
+        server: table([ port = .(port)., opts = table([ a = 0b1 ]) ]);
+        """
+        assert self.validator.validate(input_text) == []
+        assert self.validator.defined == {'port': (1, 0), 'server': (4, 2)}
+    
+    def test_no_ast(self):
+        """Тест отсутствия AST и значений констант."""
+        assert self.validator.parse("port: 0b1000;") is None
+        assert self.validator.get_constants() == {}
+    
+    def test_unknown_constant(self):
+        """Тест ошибки неизвестной константы."""
+        errors = self.validator.validate(".(port). port: 0b1000;")
+        assert errors == ["Неизвестная константа: port"]
+    
+    def test_syntax_error(self):
+        """Тест синтаксической ошибки."""
+        assert self.validator.validate("port: 0b1000") != []
+    
+    def test_same_errors_as_parser(self):
+        """Тест совпадения ошибок с полным разбором."""
+        parser = ConfigParser()
+        parser.build(debug=False, write_tables=False)
+        for text in ["a: 0b1; .(b).", "table([ x = ])", "a: @;", ""]:
+            parser.parse(text)
+            assert self.validator.validate(text) == parser.get_errors()
+    
+    def test_include(self, tmp_path):
+        """Тест констант из подключенного файла."""
+        (tmp_path / "common.txt").write_text("port: 0b1000;", encoding='utf-8')
+        errors = self.validator.validate(
+            'include "common.txt"; x: .(port).;', filename=str(tmp_path / "main.txt"))
+        assert errors == []
+    
+    def test_check_files(self, tmp_path):
+        """Тест проверки нескольких файлов."""
+        good = tmp_path / "good.txt"
+        bad = tmp_path / "bad.txt"
+        good.write_text("a: 0b1;", encoding='utf-8')
+        bad.write_text("a: .(b).;", encoding='utf-8')
+        results = check_files([str(good), str(bad)], self.validator)
+        assert results[0] == (str(good), [])
+        assert results[1][1] == ["Неизвестная константа: b"]
+    
+    def test_translator_check(self):
+        """Тест проверки через транслятор."""
+        translator = TomlTranslator()
+        assert translator.check("a: 0b1; b: .(a).;") == []
+        assert translator.check(".(a).") != []
+
+
+class TestSymbolIndex:
+    """Тесты индекса символов."""
+    
+    TEXT = (
+        "port: 0b1000;\n"
+        "timeout: 0b1; x: .(port).;\n"
+        "server: table([\n"
+        "    port = .(port).,\n"
+        "    timeout = .(timeout).\n"
+        "]);\n"
+    )
+    
+    def setup_method(self):
+        """Настройка для каждого теста."""
+        self.index = SymbolIndex()
+        assert self.index.build(self.TEXT) == []
+    
+    def splice(self, text, index, new_text):
+        """Замена области инструкции в тексте."""
+        (start_line, start_col), (end_line, end_col) = self.index.statement_range(index)
+        lines = text.split('\n')
+        offset = lambda line, col: sum(len(l) + 1 for l in lines[:line - 1]) + col - 1
+        return text[:offset(start_line, start_col)] + new_text + text[offset(end_line, end_col):]
+    
+    def assert_matches_rebuild(self, text):
+        """Проверка совпадения индекса с построенным заново."""
+        fresh = SymbolIndex()
+        assert fresh.build(text) == []
+        for name in ['port', 'timeout', 'x', 'server', 'extra']:
+            assert self.index.definition(name) == fresh.definition(name)
+            assert self.index.references(name) == fresh.references(name)
+        assert self.index.end == fresh.end
+    
+    def test_parser_spans(self):
+        """Тест положений объявлений и ссылок в парсере."""
+        parser = ConfigParser()
+        parser.build(debug=False, write_tables=False)
+        parser.parse("a: 0b1;\n  b: .(a).;")
+        assert parser.get_definitions() == [('a', Span(1, 1, 1, 2)), ('b', Span(2, 3, 2, 4))]
+        assert parser.get_references() == [('a', Span(2, 8, 2, 9))]
+    
+    def test_definition(self):
+        """Тест перехода к объявлению."""
+        assert self.index.definition('port') == Span(1, 1, 1, 5)
+        assert self.index.definition('x') == Span(2, 15, 2, 16)
+        assert self.index.definition('missing') is None
+    
+    def test_references(self):
+        """Тест поиска ссылок."""
+        assert self.index.references('port') == [Span(2, 20, 2, 24), Span(4, 14, 4, 18)]
+        assert self.index.references('timeout') == [Span(5, 17, 5, 24)]
+        assert self.index.references('missing') == []
+    
+    def test_update_same_line(self):
+        """Тест изменения инструкции, за которой на той же строке идет другая."""
+        new_text = "timeout: table([ a = .(port). ]);   "
+        text = self.splice(self.TEXT, 1, new_text)
+        assert self.index.update_statement(1, new_text) == []
+        self.assert_matches_rebuild(text)
+    
+    def test_update_adds_lines(self):
+        """Тест изменения инструкции с добавлением строк."""
+        new_text = "port: 0b1;\n\nextra: .(port).;\n"
+        text = self.splice(self.TEXT, 0, new_text)
+        assert self.index.update_statement(0, new_text) == []
+        assert len(self.index.statements) == 5
+        self.assert_matches_rebuild(text)
+    
+    def test_update_last_and_delete(self):
+        """Тест изменения последней инструкции и удаления инструкции."""
+        text = self.splice(self.TEXT, 3, "server: .(x).;")
+        assert self.index.update_statement(3, "server: .(x).;") == []
+        self.assert_matches_rebuild(text)
+        
+        text = self.splice(text, 2, "")
+        assert self.index.update_statement(2, "") == []
+        self.assert_matches_rebuild(text)
+    
+    def test_many_updates_across_blocks(self):
+        """Тест серии изменений с разбиением и удалением групп инструкций."""
+        text = "".join(f"c{chr(97 + i % 26)}: .(port).; " + ("\n" if i % 3 else "")
+                       for i in range(30))
+        text = "port: 0b1;\n" + text + "\n"
+        self.index = SymbolIndex()
+        self.index.BLOCK_SIZE = 2
+        assert self.index.build(text) == []
+        edits = [(5, "x: 0b1;\n\ny: .(x).; z: .(port).;\n"), (0, "port: 0b11;  "),
+                 (7, ""), (12, "q: table([ a = .(port). ]);\n\n\n"), (3, "w: .(port).;"),
+                 (len(self.index.statements) - 1, ""), (1, "a: 0b1; b: 0b1; c: 0b1; d: 0b1;\n")]
+        for number, new_text in edits:
+            text = self.splice(text, number, new_text)
+            assert self.index.update_statement(number, new_text) == []
+            fresh = SymbolIndex()
+            assert fresh.build(text) == []
+            for name in ['port', 'x', 'y', 'z', 'q', 'w', 'a', 'd', 'cb', 'cz']:
+                assert self.index.definition(name) == fresh.definition(name)
+                assert self.index.references(name) == fresh.references(name)
+            assert [s.start() for s in self.index.statements] == \
+                [s.start() for s in fresh.statements]
+            assert self.index.end == fresh.end
+    
+    def test_update_syntax_error(self):
+        """Тест изменения с синтаксической ошибкой."""
+        assert self.index.update_statement(0, "port: ;") != []
+        assert self.index.definition('port') == Span(1, 1, 1, 5)
+
+
+class TestBigNumbers:
+    """Тесты двоичных литералов произвольной длины."""
+    
+    BITS = 100_000
+    
+    def setup_method(self):
+        """Настройка для каждого теста."""
+        # Число из чередующихся единиц и нулей длиной BITS бит
+        self.value = int('10' * (self.BITS // 2), 2)
+        self.text = f"flags: 0b{self.value:b};"
+    
+    def test_int_to_decimal(self):
+        """Тест совпадения с str() для разных длин."""
+        limit = sys.get_int_max_str_digits()
+        sys.set_int_max_str_digits(0)
+        try:
+            for bits in [1, 64, 8192, 8193, 20000, self.BITS]:
+                value = (1 << bits) - 12345 if bits > 64 else bits
+                assert int_to_decimal(value) == str(value)
+            assert int_to_decimal(-self.value) == str(-self.value)
+        finally:
+            sys.set_int_max_str_digits(limit)
+    
+    def test_translate_huge_literal(self):
+        """Тест трансляции литерала длиннее лимита str(int)."""
+        translator = TomlTranslator()
+        toml, errors = translator.translate(self.text)
+        assert errors == []
+        assert toml.startswith("flags = ")
+        assert int(toml[len("flags = "):][:50]) > 0
+        assert len(toml) - len("flags = ") == len(int_to_decimal(self.value))
+    
+    def test_hex_format(self):
+        """Тест вывода в шестнадцатеричном виде."""
+        translator = TomlTranslator(int_format='hex')
+        toml, errors = translator.translate(self.text)
+        assert errors == []
+        assert int(toml[len("flags = "):], 16) == self.value
+    
+    def test_bin_format(self):
+        """Тест вывода в двоичном виде."""
+        translator = TomlTranslator(int_format='bin')
+        toml, errors = translator.translate("a: 0b0; t: table([ x = 0b101 ]);")
+        assert errors == []
+        assert toml == "a = 0b0\nt = { x = 0b101 }"
+    
+    def test_unknown_format(self):
+        """Тест ошибки неизвестного формата."""
+        with pytest.raises(ValueError):
+            TomlTranslator(int_format='oct')
+
+
+class TestTokenBuffer:
+    """Тесты компактного буфера токенов."""
+    
+    TEXT = """
+    // Комментарий
+    port: 0b1000;
+    include "common.txt";
+    server: table([ port = .(port)., timeout = 0B11 ]);
+    """
+    
+    def setup_method(self):
+        """Настройка для каждого теста."""
+        self.lexer = ConfigLexer()
+        self.lexer.build()
+    
+    def test_same_as_tokens(self):
+        """Тест совпадения с get_tokens."""
+        tokens = [(t.type, t.value, t.lineno, t.lexpos)
+                  for t in self.lexer.get_tokens(self.TEXT)]
+        buffer = self.lexer.get_token_buffer(self.TEXT)
+        assert len(buffer) == len(tokens)
+        assert [(buffer.type(i), buffer.value(i), buffer.lines[i], buffer.starts[i])
+                for i in range(len(buffer))] == tokens
+    
+    def test_offsets(self):
+        """Тест границ токенов в исходном тексте."""
+        buffer = self.lexer.get_token_buffer("abc: 0b101;")
+        assert [buffer.text(i) for i in range(len(buffer))] == ['abc', ':', '0b101', ';']
+        assert list(buffer.ends) == [3, 4, 10, 11]
+    
+    def test_names_interned(self):
+        """Тест интернирования имен."""
+        buffer = self.lexer.get_token_buffer("port: .(port).;")
+        assert buffer.value(0) is buffer.value(4)
+    
+    def test_lexer_errors(self):
+        """Тест передачи ошибок лексера."""
+        buffer = self.lexer.get_token_buffer("a: @0b1;")
+        assert len(buffer.errors) == 1
+    
+    def test_parse_buffer(self):
+        """Тест разбора из буфера."""
+        parser = ConfigParser()
+        parser.build(debug=False, write_tables=False)
+        text = "port: 0b1000;\nserver: table([ port = .(port). ]);"
+        expected = parser.parse(text)
+        expected_references = parser.get_references()
+        
+        result = parser.parse_buffer(self.lexer.get_token_buffer(text))
+        assert result == expected
+        assert parser.get_errors() == []
+        assert parser.get_references() == expected_references
+    
+    def test_parse_buffer_errors(self):
+        """Тест ошибок при разборе из буфера."""
+        parser = ConfigParser()
+        parser.build(debug=False, write_tables=False)
+        parser.parse_buffer(self.lexer.get_token_buffer("a: .(b).;\n@"))
+        assert len(parser.get_errors()) == 2
+
+
+class TestProfiling:
+    """Тесты профилирования трансляции."""
+    
+    TEXT = """
+    port: 0b1000;
+    server: table([ port = .(port)., opts = table([ a = 0b1, b = 0b10 ]) ]);
+    """
+    
+    def test_profile_files(self, tmp_path):
+        """Тест записи .pstats и .collapsed."""
+        translator = TomlTranslator()
+        toml, errors, pstats_path, collapsed_path = translator.profile(
+            self.TEXT, str(tmp_path / "out.pstats"))
+        assert errors == []
+        assert toml == translator.translate(self.TEXT)[0]
+        assert pstats_path == str(tmp_path / "out.pstats")
+        assert collapsed_path == str(tmp_path / "out.collapsed")
+        
+        functions = {name for _, _, name in pstats.Stats(pstats_path).stats}
+        assert 'p_table_items' in functions
+        with open(collapsed_path, encoding='utf-8') as f:
+            for line in f:
+                stack, count = line.rsplit(' ', 1)
+                assert int(count) > 0
+                assert stack.startswith('render:translate')
+    
+    def test_recursive_counts_match_cprofile(self):
+        """Тест совпадения числа вызовов и ребер вызовов с cProfile."""
+        def countdown(n):
+            return leaf() if n == 0 else countdown(n - 1) + leaf()
+        
+        def leaf():
+            return 1
+        
+        def run():
+            for _ in range(3):
+                countdown(4)
+        
+        reference = cProfile.Profile()
+        reference.runcall(run)
+        reference.create_stats()
+        profiler = StackProfiler()
+        profiler.run(run)
+        stats = profiler.pstats()
+        for key in reference.stats:
+            if key[2] in ('countdown', 'leaf'):
+                cc, nc, _, _, callers = reference.stats[key]
+                assert stats[key][:2] == (cc, nc)
+                assert {caller: counts[:2] for caller, counts in stats[key][4].items()} == \
+                    {caller: counts[:2] for caller, counts in callers.items()}
+        
+        # pstats читает ребра в порядке (nc, cc, ...)
+        countdown_key = next(key for key in stats if key[2] == 'countdown')
+        assert stats[countdown_key][4][countdown_key][:2] == (12, 3)
+    
+    def test_phase_labels(self):
+        """Тест подписей кадров по этапам."""
+        translator = TomlTranslator()
+        profiler = StackProfiler()
+        profiler.run(translator.translate_to_sections, self.TEXT)
+        frames = {frame for stack in profiler.stacks for frame in stack}
+        assert 'lexer:t_BINARY_NUMBER' in frames
+        assert 'grammar:p_table_items' in frames
+        assert 'grammar:p_const_ref' in frames
+        assert 'render:_value_to_toml' in frames
+        assert 'ply:yacc.parseopt_notrack' in frames
+        assert 'python:parser._span' in frames
+        assert not any(frame.startswith(('lexer:find_column', 'parser:'))
+                       for frame in frames)
+    
+    def test_single_run_with_include(self, tmp_path):
+        """Тест того, что оба файла описывают один запуск с разбором include."""
+        clear_include_cache()
+        (tmp_path / "common.txt").write_text("a: 0b1; b: 0b10;", encoding='utf-8')
+        main = tmp_path / "main.txt"
+        main.write_text('include "common.txt"; c: 0b11;', encoding='utf-8')
+        translator = TomlTranslator()
+        toml, errors, pstats_path, collapsed_path = translator.profile(
+            main.read_text(encoding='utf-8'), str(tmp_path / "out"), filename=str(main))
+        assert errors == []
+        
+        calls = {name: nc for (_, _, name), (_, nc, _, _, _)
+                 in pstats.Stats(pstats_path).stats.items()}
+        assert calls['p_const_declaration'] == 3
+        assert calls['_load_include'] == 1
+        
+        # Разбор подключенного файла виден и в стеках
+        with open(collapsed_path, encoding='utf-8') as f:
+            stacks = [line.rsplit(' ', 1)[0].split(';') for line in f]
+        assert any('grammar:p_include' in stack
+                   and 'ply:yacc.parseopt_notrack' in stack[stack.index('grammar:p_include'):]
+                   for stack in stacks)
+
+
+class TestTranslateMany:
+    """Тесты трансляции в несколько форматов за один разбор."""
+    
+    TEXT = """
+    port: 0b1000;
+    empty: table([]);
+    server: table([ port = .(port)., opts = table([ a = 0b1 ]) ]);
+    alias: .(server).;
+    """
+    
+    def setup_method(self):
+        """Настройка для каждого теста."""
+        self.translator = TomlTranslator()
+    
+    def test_same_as_single_outputs(self):
+        """Тест совпадения с translate и translate_to_sections."""
+        outputs, errors = self.translator.translate_many(self.TEXT, ['inline', 'sections'])
+        assert errors == []
+        assert outputs['inline'] == self.translator.translate(self.TEXT)[0]
+        assert outputs['sections'] == self.translator.translate_to_sections(self.TEXT)[0]
+    
+    def test_json(self):
+        """Тест JSON-представления."""
+        outputs, errors = self.translator.translate_many(self.TEXT, ['json'])
+        assert errors == []
+        assert list(outputs) == ['json']
+        server = {'port': 8, 'opts': {'a': 1}}
+        assert json.loads(outputs['json']) == {
+            'port': 8, 'empty': {}, 'server': server, 'alias': server}
+    
+    def test_single_parse(self, monkeypatch):
+        """Тест однократного разбора."""
+        calls = []
+        original = self.translator.parser.parse
+        monkeypatch.setattr(self.translator.parser, 'parse',
+                            lambda *args, **kwargs: calls.append(1) or original(*args, **kwargs))
+        self.translator.translate_many(self.TEXT, ['inline', 'sections', 'json'])
+        assert len(calls) == 1
+    
+    def test_errors(self):
+        """Тест передачи ошибок."""
+        outputs, errors = self.translator.translate_many(".(unknown).", ['json'])
+        assert outputs is None
+        assert len(errors) > 0
+    
+    def test_unknown_format(self):
+        """Тест ошибки неизвестного формата."""
+        with pytest.raises(ValueError):
+            self.translator.translate_many(self.TEXT, ['xml'])
+
+
+class TestExpansionLimits:
+    """Тесты ограничений на раскрытие ссылок."""
+    
+    @staticmethod
+    def laughs(levels):
+        """Конфигурация, размер которой удваивается на каждом уровне."""
+        lines = ["a: table([ x = 0b1, y = 0b1 ]);"]
+        previous = 'a'
+        for i in range(levels):
+            name = 'l' + chr(ord('a') + i)
+            lines.append(f"{name}: table([ l = .({previous}). , r = .({previous}). ]);")
+            previous = name
+        return "\n".join(lines)
+    
+    def test_exponential_expansion_rejected(self):
+        """Тест отказа при экспоненциальном раскрытии."""
+        translator = TomlTranslator()
+        toml, errors = translator.translate(self.laughs(25))
+        assert toml is None
+        assert len(errors) == 1
+        assert "число узлов" in errors[0]
+        assert "коэффициент расширения" in errors[0]
+    
+    def test_measure_linear(self, monkeypatch):
+        """Тест того, что каждый узел измеряется один раз, а не по числу ссылок."""
+        calls = []
+        original = ConfigParser._measure
+        
+        def counting_measure(parser, value):
+            calls.append(value)
+            return original(parser, value)
+        
+        monkeypatch.setattr(ConfigParser, '_measure', counting_measure)
+        parser = ConfigParser(limits=ExpansionLimits.unlimited())
+        parser.build(debug=False, write_tables=False)
+        for levels in (10, 20):
+            calls.clear()
+            parser.parse(self.laughs(levels))
+            assert parser.get_expansion()['expanded_nodes'] > 2 ** levels
+            assert len(calls) < 20 * (levels + 1)
+    
+    def test_check_agrees_with_translate(self):
+        """Тест того, что --check отклоняет то же, что и трансляция."""
+        translator = TomlTranslator()
+        errors = translator.check(self.laughs(25))
+        assert errors == translator.translate(self.laughs(25))[1]
+        
+        translator = TomlTranslator(limits=ExpansionLimits(max_depth=2))
+        text = "a: table([ b = table([ c = 0b1 ]) ]); d: table([ e = .(a). ]);"
+        assert translator.check(text) == translator.translate(text)[1] != []
+        
+        validator = ConfigValidator(limits=ExpansionLimits.unlimited())
+        validator.build(debug=False, write_tables=False)
+        parser = ConfigParser(limits=ExpansionLimits.unlimited())
+        parser.build(debug=False, write_tables=False)
+        validator.validate(self.laughs(6))
+        parser.parse(self.laughs(6))
+        assert validator.get_expansion() == parser.get_expansion()
+    
+    def test_max_nodes(self):
+        """Тест ограничения на число узлов."""
+        translator = TomlTranslator(limits=ExpansionLimits(max_nodes=100))
+        assert translator.translate(self.laughs(3))[1] == []
+        assert translator.translate(self.laughs(6))[1] != []
+    
+    def test_max_depth(self):
+        """Тест ограничения на глубину после раскрытия ссылок."""
+        translator = TomlTranslator(limits=ExpansionLimits(max_depth=2))
+        assert translator.translate("a: table([ b = table([ c = 0b1 ]) ]);")[1] == []
+        toml, errors = translator.translate(
+            "a: table([ b = table([ c = 0b1 ]) ]); d: table([ e = .(a). ]);")
+        assert "глубина" in errors[0]
+    
+    def test_max_input_bytes(self):
+        """Тест ограничения на размер входа."""
+        translator = TomlTranslator(limits=ExpansionLimits(max_input_bytes=10))
+        assert translator.translate("a: 0b1;")[1] == []
+        # Кириллица в комментарии занимает по 2 байта
+        errors = translator.translate("a: 0b1; // яя")[1]
+        assert "входных данных" in errors[0]
+    
+    def test_max_output_bytes(self):
+        """Тест ограничения на размер результата."""
+        translator = TomlTranslator(limits=ExpansionLimits(max_output_bytes=20))
+        assert translator.translate("a: 0b1;")[1] == []
+        outputs, errors = translator.translate_many(self.laughs(2), ['json'])
+        assert outputs is None
+        assert "размер результата" in errors[0]
+    
+    def test_output_limit_counts_each_format(self):
+        """Тест учета общих записей TOML в каждом формате до конца генерации."""
+        text = self.laughs(6)
+        inline, _ = TomlTranslator().translate(text)
+        translator = TomlTranslator()
+        seen = []
+        check_output = translator.limits.check_output
+        
+        def recording_check(output_bytes, input_bytes):
+            seen.append(output_bytes)
+            check_output(output_bytes, input_bytes)
+        
+        translator.limits.check_output = recording_check
+        outputs, errors = translator.translate_many(text, ['inline', 'sections'])
+        assert errors == []
+        # Последняя проверка - по точному размеру, предпоследняя - по ходу генерации
+        assert seen[-1] == len(outputs['inline']) + len(outputs['sections'])
+        assert seen[-2] > 1.5 * len(inline)
+    
+    def test_include_limits_not_cached(self, tmp_path):
+        """Тест того, что ошибка ограничения в подключенном файле не кэшируется."""
+        clear_include_cache()
+        (tmp_path / "deep.txt").write_text(
+            "common: table([ a = 0b1, b = 0b1, c = table([ d = 0b1, e = 0b1 ]) ]);",
+            encoding='utf-8')
+        (tmp_path / "common.txt").write_text('include "deep.txt";', encoding='utf-8')
+        main = tmp_path / "main.txt"
+        text = 'include "common.txt"; x: .(common).;'
+        main.write_text(text, encoding='utf-8')
+        
+        strict = TomlTranslator(limits=ExpansionLimits(max_nodes=5))
+        errors = strict.translate(text, filename=str(main))[1]
+        assert any("6 > 5" in error for error in errors)
+        
+        toml, errors = TomlTranslator(limits=ExpansionLimits.unlimited()).translate(
+            text, filename=str(main))
+        assert errors == []
+        assert "x = { a = 1, b = 1, c = { d = 1, e = 1 } }" in toml
+    
+    def test_unlimited(self):
+        """Тест отключения ограничений."""
+        translator = TomlTranslator(limits=ExpansionLimits.unlimited())
+        toml, errors = translator.translate(self.laughs(8))
+        assert errors == []
+    
+    def test_stats(self):
+        """Тест отчета о коэффициенте расширения."""
+        translator = TomlTranslator()
+        toml, errors = translator.translate(self.laughs(4))
+        stats = translator.get_stats()
+        assert stats['output_size'] == len(toml)
+        assert stats['ratio'] == len(toml) / stats['input_size']
+        assert stats['source_nodes'] == 3 + 4 * 3
+        assert stats['expanded_nodes'] == 3 + 7 + 15 + 31 + 63
+        assert stats['depth'] == 5
+
+
+class TestStreaming:
+    """Тесты разбора текста, поступающего частями."""
+    
+    TEXT = (
+        "// Комментарий\n"
+        "port: 0b1000;   timeout: 0b11;\n"
+        "server: table([\n"
+        "    port = .(port).,\n"
+        "    timeout = .(timeout).\n"
+        "]);\n"
+    )
+    
+    @staticmethod
+    def split(text, size):
+        """Разбиение текста на части по size символов."""
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    
+    def test_stream_tokens(self):
+        """Тест совпадения токенов при любом размере частей."""
+        lexer = ConfigLexer()
+        lexer.build()
+        expected = [(t.type, t.value, t.lineno, t.lexpos) for t in lexer.get_tokens(self.TEXT)]
+        for size in [1, 2, 7, 1000]:
+            stream = lexer.stream(self.split(self.TEXT, size))
+            tokens = []
+            while True:
+                tok = stream.token()
+                if tok is None:
+                    break
+                tokens.append((tok.type, tok.value, tok.lineno, tok.lexpos))
+            assert tokens == expected
+    
+    def test_stream_single_line(self):
+        """Тест разбора конфигурации в одну строку небольшими кусками."""
+        text = ('a: 0b101; s: "x, y;z"; t: table([ k = .(a)., m = 0b11 ]);'
+                + ' x: 0b1;' * 200 + ' ab: 0b1/ // q: 0b1; "r, (s)"\nb: 0b1;')
+        lexer = ConfigLexer()
+        lexer.build()
+        expected = [(t.type, t.value, t.lexpos, ConfigLexer.find_column(text, t.lexpos))
+                    for t in lexer.get_tokens(text)]
+        errors = list(lexer.errors)
+        for size in [1, 2, 3, 7, 16]:
+            stream = lexer.stream(self.split(text, size))
+            tokens = []
+            longest = 0
+            while True:
+                tok = stream.token()
+                if tok is None:
+                    break
+                longest = max(longest, len(stream.lexdata))
+                tokens.append((tok.type, tok.value, tok.lexpos, tok.column))
+            assert tokens == expected
+            assert stream.errors == errors
+            # Строка передается лексеру по частям, а не целиком
+            assert longest < 40
+    
+    def test_parse_stream(self):
+        """Тест совпадения результата и положений имен с parse."""
+        parser = ConfigParser()
+        parser.build(debug=False, write_tables=False)
+        expected = parser.parse(self.TEXT)
+        definitions = parser.get_definitions()
+        references = parser.get_references()
+        for size in [1, 5, 64]:
+            assert parser.parse_stream(self.split(self.TEXT, size)) == expected
+            assert parser.get_errors() == []
+            assert parser.get_definitions() == definitions
+            assert parser.get_references() == references
+    
+    def test_parse_stream_errors(self):
+        """Тест ошибок с номерами строк при разборе частями."""
+        parser = ConfigParser()
+        parser.build(debug=False, write_tables=False)
+        parser.parse_stream(self.split("a: 0b1;\nb: 0b1\nc: @;\n", 3))
+        errors = parser.get_errors()
+        assert any("строке 3" in error for error in errors)
+    
+    def test_input_limit_while_reading(self):
+        """Тест остановки чтения при превышении размера входа."""
+        read = []
+        
+        def chunks():
+            for i in range(1000):
+                read.append(i)
+                yield "a: 0b1;\n"
+        
+        parser = ConfigParser(limits=ExpansionLimits(max_input_bytes=80))
+        parser.build(debug=False, write_tables=False)
+        parser.parse_stream(chunks())
+        assert "входных данных" in parser.get_errors()[0]
+        assert len(read) == 11
+    
+    @pytest.mark.parametrize('compress', [gzip.compress, lzma.compress, bz2.compress, None])
+    def test_compressed_files(self, tmp_path, compress):
+        """Тест распознавания сжатых файлов по сигнатуре."""
+        data = self.TEXT.encode('utf-8')
+        path = tmp_path / "config.dat"
+        path.write_bytes(compress(data) if compress else data)
+        translator = TomlTranslator()
+        with open_source(str(path)) as source:
+            outputs, errors = translator.translate_chunks(
+                iter_chunks(source, 16), ['sections'], filename=str(path))
+        assert errors == []
+        assert outputs['sections'] == translator.translate_to_sections(self.TEXT)[0]
+    
+    @pytest.mark.parametrize('compress', [gzip.compress, lzma.compress, bz2.compress, None])
+    def test_stdin(self, monkeypatch, compress):
+        """Тест чтения сжатого стандартного ввода, поступающего по одному байту."""
+        data = b"a: 0b101;"
+        
+        class SlowPipe(io.RawIOBase):
+            """Канал, из которого за один вызов читается один байт."""
+            
+            def __init__(self, data):
+                self.data = data
+            
+            def readable(self):
+                return True
+            
+            def readinto(self, buffer):
+                if not self.data:
+                    return 0
+                buffer[0] = self.data[0]
+                self.data = self.data[1:]
+                return 1
+        
+        pipe = SlowPipe(compress(data) if compress else data)
+        monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BufferedReader(pipe)))
+        with open_source('-') as source:
+            assert source.read() == "a: 0b101;"
+    
+    def test_check_files_compressed(self, tmp_path):
+        """Тест проверки сжатого файла."""
+        path = tmp_path / "bad.gz"
+        path.write_bytes(gzip.compress(b"a: .(b).;"))
+        assert check_files([str(path)])[0][1] == ["Неизвестная константа: b"]
+
+
+class TestPyModule:
+    """Тесты вывода в виде модуля Python."""
+    
+    TEXT = """
+    port: 0b1000;
+    empty: table([]);
+    single: table([ a = 0b1 ]);
+    server: table([ port = .(port)., opts = .(single)., nested = table([ x = 0b11 ]) ]);
+    alias: .(server).;
+    """
+    
+    @staticmethod
+    def load(source, tmp_path):
+        """Импорт сгенерированного модуля из файла."""
+        path = tmp_path / "config_data.py"
+        path.write_text(source, encoding='utf-8')
+        spec = importlib.util.spec_from_file_location("config_data", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    
+    @classmethod
+    def thaw(cls, value):
+        """Преобразование вложенных MappingProxyType в dict."""
+        if isinstance(value, int):
+            return value
+        return {name: cls.thaw(item) for name, item in value.items()}
+    
+    def test_matches_translate(self, tmp_path):
+        """Тест совпадения данных модуля с результатом translate."""
+        translator = TomlTranslator()
+        outputs, errors = translator.translate_many(self.TEXT, ['pymodule'])
+        assert errors == []
+        module = self.load(outputs['pymodule'], tmp_path)
+        expected = tomllib.loads(translator.translate(self.TEXT)[0])
+        assert self.thaw(module.CONFIG) == expected
+        assert self.thaw(module.CONFIG) == tomllib.loads(translator.translate_to_sections(self.TEXT)[0])
+    
+    def test_data_is_single_constant(self):
+        """Тест сворачивания данных в одну константу байт-кода."""
+        outputs, _ = TomlTranslator().translate_many(self.TEXT, ['pymodule'])
+        code = compile(outputs['pymodule'], "config_data.py", 'exec')
+        data = [const for const in code.co_consts if isinstance(const, tuple) and len(const) == 5]
+        assert len(data) == 1
+        assert data[0][0] == ('port', 8)
+    
+    def test_read_only(self, tmp_path):
+        """Тест доступа только для чтения."""
+        outputs, _ = TomlTranslator().translate_many(self.TEXT, ['pymodule'])
+        module = self.load(outputs['pymodule'], tmp_path)
+        with pytest.raises(TypeError):
+            module.CONFIG['port'] = 1
+        with pytest.raises(TypeError):
+            module.CONFIG['server']['nested']['x'] = 1
+        assert module.get('server.nested.x') == 3
+        assert module.get('server.port.x') is None
+        assert module.get('missing', 0) == 0
+    
+    def test_huge_literal(self, tmp_path):
+        """Тест числа длиннее лимита десятичных литералов."""
+        value = (1 << 100_000) - 1
+        outputs, errors = TomlTranslator().translate_many(f"flags: 0b{value:b};", ['pymodule'])
+        assert errors == []
+        assert self.load(outputs['pymodule'], tmp_path).CONFIG['flags'] == value
+
+
 # Запуск тестов
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
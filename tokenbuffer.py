@@ -0,0 +1,105 @@
+import sys
+from array import array
+
+from ply.lex import LexToken
+
+
+class TokenBuffer:
+    """
+    Компактное хранилище токенов.
+    
+    Вместо списка объектов LexToken хранятся параллельные массивы:
+    код типа, начало и конец токена в исходном тексте и номер строки.
+    Значения вычисляются из исходного текста только по запросу.
+    """
+    
+    def __init__(self, data, token_types):
+        """
+        Инициализация буфера.
+        
+        Args:
+            data: Исходный текст
+            token_types: Кортеж имен типов токенов; код типа - индекс в нем
+        """
+        self.data = data
+        self.token_types = tuple(token_types)
+        self.type_codes = array('B')  # Код типа токена
+        self.starts = array('Q')      # Начало токена в data
+        self.ends = array('Q')        # Конец токена в data (не включая)
+        self.lines = array('I')       # Номер строки
+        self.errors = []              # Ошибки лексического анализа
+    
+    def __len__(self):
+        """Количество токенов."""
+        return len(self.type_codes)
+    
+    def append(self, type_code, start, end, line):
+        """Добавление токена."""
+        self.type_codes.append(type_code)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+    
+    def type(self, index):
+        """Имя типа токена."""
+        return self.token_types[self.type_codes[index]]
+    
+    def text(self, index):
+        """Исходный текст токена."""
+        return self.data[self.starts[index]:self.ends[index]]
+    
+    def value(self, index):
+        """
+        Значение токена, как у соответствующего LexToken.
+        
+        Имена интернируются, чтобы одинаковые имена не занимали память
+        по отдельности.
+        """
+        token_type = self.type(index)
+        text = self.text(index)
+        if token_type == 'BINARY_NUMBER':
+            return int(text, 2)
+        if token_type == 'STRING':
+            return text[1:-1]
+        if token_type == 'NAME':
+            return sys.intern(text)
+        return text
+    
+    def token(self, index):
+        """Создание LexToken для токена с номером index."""
+        tok = LexToken()
+        tok.type = self.type(index)
+        tok.value = self.value(index)
+        tok.lineno = self.lines[index]
+        tok.lexpos = self.starts[index]
+        return tok
+    
+    def reader(self):
+        """Лексер для парсера, читающий токены из буфера."""
+        return TokenBufferReader(self)
+
+
+class TokenBufferReader:
+    """
+    Источник токенов для ply.yacc поверх TokenBuffer.
+    
+    Объекты LexToken создаются по одному при запросе и не сохраняются.
+    """
+    
+    def __init__(self, buffer):
+        """Инициализация чтения с начала буфера."""
+        self.buffer = buffer
+        self.lexdata = buffer.data
+        self.position = 0
+        self.lineno = 1  # Строка и позиция после последнего токена
+        self.lexpos = 0
+    
+    def token(self):
+        """Получение следующего токена или None в конце буфера."""
+        if self.position >= len(self.buffer):
+            return None
+        tok = self.buffer.token(self.position)
+        self.lineno = tok.lineno
+        self.lexpos = self.buffer.ends[self.position]
+        self.position += 1
+        return tok
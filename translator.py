@@ -1,56 +1,324 @@
+import decimal
+import json
+
+from limits import ExpansionLimits, ExpansionLimitError
 from parser import ConfigParser
+from profiling import profile_call
+from validator import ConfigValidator
+
+
+# Числа длиннее этого порога (в битах) переводятся в десятичную запись
+# через int_to_decimal: str() для них квадратичен и ограничен
+# sys.get_int_max_str_digits()
+DECIMAL_THRESHOLD_BITS = 8192
+
+# Форматы вывода целых чисел
+INT_FORMATS = ('dec', 'hex', 'bin')
+
+# Форматы вывода translate_many
+EMIT_FORMATS = ('inline', 'sections', 'json', 'pymodule')
+
+# Начало и конец модуля Python, который строит формат pymodule
+PYMODULE_HEADER = '''\
+\"\"\"Конфигурация, сгенерированная транслятором. Не редактировать.\"\"\"
+from types import MappingProxyType as _MappingProxyType
+
+# Таблицы записаны кортежами пар (имя, значение): такой литерал целиком
+# сворачивается компилятором в одну константу и загружается из .pyc
+# модулем marshal без разбора текста
+_DATA = (
+'''
+
+PYMODULE_FOOTER = '''\
+)
+
+
+def _freeze(items):
+    return _MappingProxyType({
+        name: _freeze(value) if isinstance(value, tuple) else value
+        for name, value in items
+    })
+
+
+# Конфигурация только для чтения
+CONFIG = _freeze(_DATA)
+
+
+def get(path, default=None):
+    \"\"\"Значение по пути вида 'server.network.port' или default.\"\"\"
+    value = CONFIG
+    for key in path.split('.'):
+        try:
+            value = value[key]
+        except (KeyError, TypeError):
+            return default
+    return value
+'''
+
+
+def int_to_decimal(value):
+    """
+    Десятичная запись целого числа произвольной длины.
+    
+    Число делится пополам по битам, половины переводятся рекурсивно и
+    собираются умножением в модуле decimal, где умножение больших чисел
+    субквадратично. Ограничение на длину str(int) не применяется.
+    
+    Args:
+        value: Целое число
+        
+    Returns:
+        Строка с десятичной записью
+    """
+    if value < 0:
+        return '-' + int_to_decimal(-value)
+    if value.bit_length() <= DECIMAL_THRESHOLD_BITS:
+        return str(value)
+    
+    powers = {}  # w -> 2**w в виде Decimal
+    
+    def power_of_two(w):
+        result = powers.get(w)
+        if result is None:
+            if w <= 128:
+                result = decimal.Decimal(1 << w)
+            elif w - 1 in powers:
+                result = powers[w - 1] * 2
+            else:
+                half = w >> 1
+                result = power_of_two(half) * power_of_two(w - half)
+            powers[w] = result
+        return result
+    
+    def convert(n, w):
+        if w <= 128:
+            return decimal.Decimal(n)
+        half = w >> 1
+        high = n >> half
+        low = n - (high << half)
+        return convert(low, half) + convert(high, w - half) * power_of_two(half)
+    
+    with decimal.localcontext() as ctx:
+        ctx.prec = decimal.MAX_PREC
+        ctx.Emax = decimal.MAX_EMAX
+        ctx.Emin = decimal.MIN_EMIN
+        ctx.traps[decimal.Inexact] = True
+        return str(convert(value, value.bit_length()))
 
 
 class TomlTranslator:
     """Транслятор в формат TOML."""
     
-    def __init__(self):
-        """Инициализация транслятора."""
-        self.parser = ConfigParser()
+    def __init__(self, int_format='dec', limits=None):
+        """
+        Инициализация транслятора.
+        
+        Args:
+            int_format: Запись целых чисел: 'dec' - десятичная,
+                'hex' - 0x..., 'bin' - 0b... (без перевода в десятичную)
+            limits: Ограничения ExpansionLimits (по умолчанию стандартные)
+        """
+        if int_format not in INT_FORMATS:
+            raise ValueError(f"Неизвестный формат чисел: {int_format}")
+        self.int_format = int_format
+        self.limits = limits if limits is not None else ExpansionLimits()
+        self.parser = ConfigParser(limits=self.limits)
         self.parser.build(debug=False, write_tables=False)
         self.output_lines = []
         self.table_counter = 0
+        self.validator = None  # Создается при первой проверке
+        self.input_size = 0    # Размер входного текста
+        self.output_size = 0   # Размер сгенерированного текста
     
-    def translate(self, input_text):
+    def check(self, input_text, filename=None):
+        """
+        Проверка входного текста без построения AST и генерации TOML.
+        
+        Args:
+            input_text: Текст на учебном конфигурационном языке
+            filename: Путь к входному файлу (для директив include)
+            
+        Returns:
+            Список ошибок (пустой, если конфигурация корректна)
+        """
+        if self.validator is None:
+            self.validator = ConfigValidator(limits=self.limits)
+            self.validator.build(debug=False, write_tables=False)
+        return self.validator.validate(input_text, filename=filename)
+    
+    def translate(self, input_text, filename=None):
         """
         Трансляция входного текста в TOML.
         
         Args:
             input_text: Текст на учебном конфигурационном языке
+            filename: Путь к входному файлу (для директив include)
             
         Returns:
             Кортеж (toml_output, errors)
         """
+        outputs, errors = self.translate_many(input_text, ['inline'], filename=filename)
+        if errors:
+            return None, errors
+        return outputs['inline'], []
+    
+    def translate_many(self, input_text, formats, filename=None):
+        """
+        Трансляция в несколько форматов за один разбор.
+        
+        Текст разбирается один раз, после чего все выбранные форматы
+        строятся за один проход по константам. Записи таблиц в TOML
+        общие для инлайн-вывода и вывода с секциями.
+        
+        Args:
+            input_text: Текст на учебном конфигурационном языке
+            formats: Набор форматов из EMIT_FORMATS
+                ('inline', 'sections', 'json', 'pymodule')
+            filename: Путь к входному файлу (для директив include)
+            
+        Returns:
+            Кортеж (outputs, errors), где outputs - словарь формат -> текст
+        """
+        formats = self._check_formats(formats)
+        self.parser.parse(input_text, filename=filename)
+        return self._translate_parsed(formats)
+    
+    def translate_chunks(self, chunks, formats=('inline',), filename=None):
+        """
+        Трансляция текста, поступающего частями.
+        
+        Части передаются лексеру по мере чтения, поэтому, например,
+        сжатый файл транслируется без распаковки на диск и без хранения
+        всего распакованного текста в памяти.
+        
+        Args:
+            chunks: Итератор строк (например, sources.iter_chunks())
+            formats: Набор форматов из EMIT_FORMATS
+            filename: Путь к входному файлу (для директив include)
+            
+        Returns:
+            Кортеж (outputs, errors), как у translate_many
+        """
+        formats = self._check_formats(formats)
+        self.parser.parse_stream(chunks, filename=filename)
+        return self._translate_parsed(formats)
+    
+    @staticmethod
+    def _check_formats(formats):
+        """Проверка списка форматов вывода."""
+        formats = set(formats)
+        unknown = formats - set(EMIT_FORMATS)
+        if unknown:
+            raise ValueError(f"Неизвестный формат вывода: {', '.join(sorted(unknown))}")
+        return formats
+    
+    def _translate_parsed(self, formats):
+        """Генерация результата по только что разобранному тексту."""
         self.output_lines = []
         self.table_counter = 0
+        self.input_size = self.parser.input_size
+        self.output_size = 0
         
-        # Разбор входного текста
-        result = self.parser.parse(input_text)
         errors = self.parser.get_errors()
-        
         if errors:
             return None, errors
         
-        # Генерация TOML
-        constants = self.parser.get_constants()
+        try:
+            return self._emit(formats), []
+        except ExpansionLimitError as e:
+            return None, [str(e)]
+    
+    def _emit(self, formats):
+        """Построение выбранных форматов за один проход по константам."""
+        # Записи таблиц строятся один раз, но входят в каждый формат TOML
+        toml_copies = ('inline' in formats) + ('sections' in formats)
+        emit_toml = toml_copies > 0
+        inline_lines = []
+        simple_lines = []    # Простые константы для вывода с секциями
+        section_lines = []   # Таблицы как секции
+        json_lines = []
+        python_lines = []
         
-        # Выводим все константы
-        for name, value in constants.items():
-            toml_value = self._value_to_toml(value)
-            self.output_lines.append(f"{name} = {toml_value}")
+        for name, value in self.parser.get_constants().items():
+            if emit_toml:
+                charged = self.output_size
+                if isinstance(value, tuple) and value[0] == 'table':
+                    parts = self._table_items_to_toml(value[1])
+                    toml_value = "{ " + ", ".join(parts) + " }" if parts else "{}"
+                    section_lines.append("")
+                    section_lines.append(f"[{name}]")
+                    section_lines.extend(parts)
+                    line = f"{name} = {toml_value}"
+                else:
+                    line = f"{name} = {self._value_to_toml(value)}"
+                    simple_lines.append(line)
+                inline_lines.append(line)
+                self._charge((toml_copies - 1) * (self.output_size - charged))
+            if 'json' in formats:
+                json_lines.append(f"  {json.dumps(name)}: {self._value_to_json(value)}")
+            if 'pymodule' in formats:
+                python_lines.append(f"    ({name!r}, {self._value_to_python(value)}),\n")
         
-        # Обрабатываем остальные выражения (таблицы верхнего уровня)
-        if result:
-            for item in result:
-                if item is not None and not isinstance(item, tuple):
-                    continue
-                if item is not None and item[0] != 'const_decl':
-                    toml_value = self._value_to_toml(item)
-                    if item[0] == 'table':
-                        # Таблица верхнего уровня уже обработана
-                        pass
+        outputs = {}
+        if 'inline' in formats:
+            outputs['inline'] = '\n'.join(inline_lines)
+            self.output_lines = inline_lines
+        if 'sections' in formats:
+            outputs['sections'] = '\n'.join(simple_lines + section_lines)
+            self.output_lines = simple_lines + section_lines
+        if 'json' in formats:
+            outputs['json'] = "{\n" + ",\n".join(json_lines) + "\n}" if json_lines else "{}"
+        if 'pymodule' in formats:
+            outputs['pymodule'] = PYMODULE_HEADER + ''.join(python_lines) + PYMODULE_FOOTER
         
-        return '\n'.join(self.output_lines), []
+        # Точный итоговый размер (при генерации учитывались только значения)
+        self.output_size = sum(len(output) for output in outputs.values())
+        self.limits.check_output(self.output_size, self.input_size)
+        return outputs
+    
+    def get_stats(self):
+        """
+        Размеры последней трансляции.
+        
+        Returns:
+            Словарь: размеры входа и результата в символах, число узлов
+            в тексте и после раскрытия ссылок, глубина и коэффициент
+            расширения результата относительно входа
+        """
+        stats = {
+            'input_size': self.input_size,
+            'output_size': self.output_size,
+            'ratio': self.output_size / max(self.input_size, 1),
+        }
+        stats.update(self.parser.get_expansion())
+        return stats
+    
+    def _charge(self, size):
+        """Учет size символов результата с проверкой ограничения."""
+        self.output_size += size
+        self.limits.check_output(self.output_size, self.input_size)
+    
+    def profile(self, input_text, output, sections=False, filename=None):
+        """
+        Трансляция под профилировщиком.
+        
+        Записывает OUT.pstats (формат pstats) и OUT.collapsed (стеки для
+        flamegraph с подписями этапов lexer:, grammar:, render:); оба
+        файла строятся из одного запуска трансляции.
+        
+        Args:
+            input_text: Текст на учебном конфигурационном языке
+            output: Путь к файлам профиля без расширения
+            sections: Использовать translate_to_sections вместо translate
+            filename: Путь к входному файлу (для директив include)
+            
+        Returns:
+            Кортеж (toml_output, errors, pstats_path, collapsed_path)
+        """
+        translate = self.translate_to_sections if sections else self.translate
+        (toml_output, errors), pstats_path, collapsed_path = profile_call(
+            translate, output, input_text, filename=filename)
+        return toml_output, errors, pstats_path, collapsed_path
     
     def _value_to_toml(self, value, indent=0):
         """
@@ -64,7 +332,9 @@ class TomlTranslator:
             Строка в формате TOML
         """
         if isinstance(value, int):
-            return str(value)
+            text = self._int_to_toml(value)
+            self._charge(len(text))
+            return text
         
         if isinstance(value, tuple):
             if value[0] == 'table':
@@ -79,6 +349,14 @@ class TomlTranslator:
         
         return str(value)
     
+    def _int_to_toml(self, value):
+        """Запись целого числа в выбранном формате."""
+        if self.int_format == 'hex':
+            return format(value, '#x')
+        if self.int_format == 'bin':
+            return format(value, '#b')
+        return int_to_decimal(value)
+    
     def _table_to_toml(self, items, indent=0):
         """
         Преобразование таблицы в TOML формат.
@@ -91,64 +369,97 @@ class TomlTranslator:
             Строка в формате TOML
         """
         if not items:
+            self._charge(2)
             return "{}"
         
         # Для инлайн-таблиц
+        parts = self._table_items_to_toml(items, indent + 1)
+        self._charge(2 * len(parts) + 2)
+        return "{ " + ", ".join(parts) + " }"
+    
+    def _table_items_to_toml(self, items, indent=0):
+        """Список записей "имя = значение" для элементов таблицы."""
         parts = []
         for name, value in items:
-            toml_value = self._value_to_toml(value, indent + 1)
-            parts.append(f"{name} = {toml_value}")
+            self._charge(len(name) + 3)
+            parts.append(f"{name} = {self._value_to_toml(value, indent)}")
+        return parts
+    
+    def _value_to_json(self, value):
+        """
+        Преобразование значения в JSON.
         
-        return "{ " + ", ".join(parts) + " }"
+        Числа всегда записываются в десятичном виде: в JSON нет
+        шестнадцатеричных и двоичных литералов.
+        """
+        if isinstance(value, int):
+            text = int_to_decimal(value)
+            self._charge(len(text))
+            return text
+        
+        if isinstance(value, tuple):
+            if value[0] == 'table':
+                parts = []
+                for name, item in value[1]:
+                    self._charge(len(name) + 4)
+                    parts.append(f"{json.dumps(name)}: {self._value_to_json(item)}")
+                self._charge(2 * len(parts) + 2)
+                return "{" + ", ".join(parts) + "}"
+            elif value[0] == 'const_ref':
+                if value[2] is not None:
+                    return self._value_to_json(value[2])
+                return "null"
+        
+        return json.dumps(str(value))
+    
+    def _value_to_python(self, value):
+        """
+        Преобразование значения в литерал Python для формата pymodule.
+        
+        Таблицы записываются кортежами пар (имя, значение). Длинные числа
+        записываются в шестнадцатеричном виде: десятичные литералы длиннее
+        sys.get_int_max_str_digits() не компилируются.
+        """
+        if isinstance(value, int):
+            if value.bit_length() > DECIMAL_THRESHOLD_BITS:
+                text = hex(value)
+            else:
+                text = str(value)
+            self._charge(len(text))
+            return text
+        
+        if isinstance(value, tuple):
+            if value[0] == 'table':
+                parts = []
+                for name, item in value[1]:
+                    self._charge(len(name) + 6)
+                    parts.append(f"({name!r}, {self._value_to_python(item)})")
+                self._charge(2 * len(parts) + 2)
+                if len(parts) == 1:
+                    return f"({parts[0]},)"
+                return "(" + ", ".join(parts) + ")"
+            elif value[0] == 'const_ref':
+                if value[2] is not None:
+                    return self._value_to_python(value[2])
+                return "None"
+        
+        return repr(str(value))
     
-    def translate_to_sections(self, input_text):
+    def translate_to_sections(self, input_text, filename=None):
         """
         Трансляция входного текста в TOML с секциями.
         
         Args:
             input_text: Текст на учебном конфигурационном языке
+            filename: Путь к входному файлу (для директив include)
             
         Returns:
             Кортеж (toml_output, errors)
         """
-        self.output_lines = []
-        self.table_counter = 0
-        
-        # Разбор входного текста
-        result = self.parser.parse(input_text)
-        errors = self.parser.get_errors()
-        
+        outputs, errors = self.translate_many(input_text, ['sections'], filename=filename)
         if errors:
             return None, errors
-        
-        # Генерация TOML с секциями
-        constants = self.parser.get_constants()
-        
-        # Выводим простые константы
-        simple_constants = []
-        table_constants = []
-        
-        for name, value in constants.items():
-            if isinstance(value, tuple) and value[0] == 'table':
-                table_constants.append((name, value))
-            else:
-                simple_constants.append((name, value))
-        
-        # Выводим простые константы
-        for name, value in simple_constants:
-            toml_value = self._value_to_toml(value)
-            self.output_lines.append(f"{name} = {toml_value}")
-        
-        # Выводим таблицы как секции
-        for name, value in table_constants:
-            self.output_lines.append("")
-            self.output_lines.append(f"[{name}]")
-            if value[0] == 'table':
-                for item_name, item_value in value[1]:
-                    toml_value = self._value_to_toml(item_value)
-                    self.output_lines.append(f"{item_name} = {toml_value}")
-        
-        return '\n'.join(self.output_lines), []
+        return outputs['sections'], []
 
 
 # Функция для тестирования транслятора
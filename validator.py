@@ -0,0 +1,135 @@
+from parser import ConfigParser, UNKNOWN_CONSTANT
+from sources import READ_ERRORS, iter_chunks, open_source
+
+
+class ConfigValidator(ConfigParser):
+    """
+    Проверка синтаксиса без построения AST.
+    
+    Грамматика совпадает с ConfigParser, но семантические действия ничего
+    не строят: для каждой объявленной константы запоминается только ее
+    размер после раскрытия ссылок. Этого достаточно, чтобы находить
+    ссылки на неизвестные константы и проверять те же ограничения
+    ExpansionLimits, что и при трансляции.
+    """
+    
+    def __init__(self, limits=None):
+        """Инициализация валидатора."""
+        super().__init__(limits=limits)
+        self.defined = {}  # Имя константы -> (число узлов, глубина)
+    
+    # Правила грамматики (без построения узлов); значением value
+    # служит пара (число узлов, глубина) после раскрытия ссылок
+    
+    def p_program(self, p):
+        """program : statements"""
+    
+    def p_statements(self, p):
+        """statements : statements statement
+                      | statement
+                      | empty"""
+    
+    def p_statement(self, p):
+        """statement : const_declaration
+                     | include
+                     | value"""
+    
+    def p_const_declaration(self, p):
+        """const_declaration : NAME COLON value SEMICOLON"""
+        self.defined[p[1]] = p[3]
+        self._count_size(*p[3])
+    
+    def p_include(self, p):
+        """include : INCLUDE STRING SEMICOLON"""
+        constants, errors = self._load_include(self._resolve_include(p[2]))
+        self.errors.extend(errors)
+        for name, value in constants.items():
+            self.defined[name] = self._measure(value)
+            self._count_constant(value)
+    
+    def p_value(self, p):
+        """value : BINARY_NUMBER
+                 | table
+                 | const_ref"""
+        p[0] = (1, 0) if isinstance(p[1], int) else p[1]
+        self.source_nodes += 1
+    
+    def p_table(self, p):
+        """table : TABLE LPAREN LBRACKET table_items RBRACKET RPAREN
+                 | TABLE LPAREN LBRACKET RBRACKET RPAREN"""
+        nodes, depth = p[4] if len(p) == 7 else (0, 0)
+        p[0] = (nodes + 1, depth + 1)
+        self.limits.check_depth(depth + 1)
+        self.limits.check_nodes(nodes + 1, self.source_nodes)
+    
+    def p_table_items(self, p):
+        """table_items : table_items COMMA table_item
+                       | table_item"""
+        if len(p) == 4:
+            p[0] = (p[1][0] + p[3][0], max(p[1][1], p[3][1]))
+        else:
+            p[0] = p[1]
+    
+    def p_table_item(self, p):
+        """table_item : NAME EQUALS value"""
+        p[0] = p[3]
+    
+    def p_const_ref(self, p):
+        """const_ref : DOT LPAREN NAME RPAREN DOT"""
+        if p[3] in self.defined:
+            p[0] = self.defined[p[3]]
+        else:
+            self.errors.append(f"{UNKNOWN_CONSTANT}: {p[3]}")
+            p[0] = (1, 0)
+    
+    def p_empty(self, p):
+        """empty :"""
+    
+    def _reset(self, filename, tracking):
+        """Сброс состояния перед разбором."""
+        super()._reset(filename, tracking)
+        self.defined = {}
+    
+    def validate(self, data, filename=None):
+        """
+        Проверка входных данных.
+        
+        Args:
+            data: Текст на учебном конфигурационном языке
+            filename: Путь к файлу (для директив include)
+        
+        Returns:
+            Список ошибок (пустой, если конфигурация корректна)
+        """
+        self.parse(data, filename=filename)
+        return list(self.errors)
+
+
+def check_files(paths, validator=None):
+    """
+    Проверка нескольких файлов одним валидатором.
+    
+    Файлы читаются частями; сжатые файлы распаковываются по мере чтения.
+    
+    Args:
+        paths: Пути к файлам
+        validator: Готовый ConfigValidator (по умолчанию создается новый)
+    
+    Returns:
+        Список пар (path, errors) в порядке входных путей
+    """
+    if validator is None:
+        validator = ConfigValidator()
+        validator.build(debug=False, write_tables=False)
+    
+    results = []
+    for path in paths:
+        filename = None if path == '-' else path
+        try:
+            with open_source(path) as source:
+                validator.parse_stream(iter_chunks(source), filename=filename)
+        except READ_ERRORS as e:
+            results.append((path, [f"Ошибка чтения файла: {e}"]))
+            continue
+        results.append((path, list(validator.errors)))
+    return results